@@ -0,0 +1,305 @@
+"""Benchmarks for the C-minus front end.
+
+Usage: python3 benchmark.py [input.txt] [--functions N] [--repeat R]
+
+Without an input file a synthetic program with N functions is used.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from itertools import cycle
+
+from context import CompilationContext
+from incremental_lexer import IncrementalLexer
+from incremental_parser import IncrementalParser
+from parallel_lexer import lex_parallel
+from parallel_parser import ParallelParser
+from parser import Parser
+from parser_generator import load_generated_parser
+from regex_scanner import RegexScanner
+from scanner import Scanner
+from semantic import SemanticActions
+from stack_parser import StackParser
+from token_buffer import TokenBuffer
+from tokens import TokenType
+from tree_arena import ParseTreeArena
+
+# The recursive-descent engines recurse once per statement / declaration
+sys.setrecursionlimit(20000)
+
+
+FUNCTION_TEMPLATE = """\
+int f{index}(int a, int b[]) {{
+    int i;
+    int total[10];
+    i = 0;
+    for (i = 0; i < a; i = i + 1) {{
+        if (b[i] == {index}) {{
+            total[i] = total[i] + a * (b[i] - 3) / 2;
+        }} else {{
+            total[i] = f{index}(i, b) + -1;
+        }}
+        if (i < 5) break;
+    }}
+    return total[0] + i;
+}}
+"""
+
+
+def synthetic_program(functions: int) -> str:
+    """A valid C-minus program with the given number of functions."""
+    parts = ["int counter;", "int table[100];"]
+    parts.extend(FUNCTION_TEMPLATE.format(index=i) for i in range(functions))
+    parts.append("void main(void) {\n    counter = f0(3, table);\n}\n")
+    return "\n".join(parts)
+
+
+def lex(source: str, scanner_class=Scanner, context: CompilationContext = None) -> list:
+    scanner = scanner_class(source, context)
+    tokens = []
+    while True:
+        token = scanner.get_next_token()
+        tokens.append(token)
+        if token.token_type == TokenType.EOF:
+            return tokens
+
+
+def time_best(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_scanners(source: str, repeat: int) -> None:
+    engines = [
+        ("char", Scanner, True),
+        ("regex", RegexScanner, True),
+        ("regex/no-tokens", RegexScanner, False),
+    ]
+    print(f"Scanning {len(source):,} characters, best of {repeat}:")
+    baseline = None
+    for name, scanner_class, record_tokens in engines:
+        count = 0
+
+        def run():
+            nonlocal count
+            count = len(lex(source, scanner_class, CompilationContext(record_tokens)))
+
+        seconds = time_best(run, repeat)
+        baseline = baseline or seconds
+        print(
+            f"  {name:<16} {seconds * 1000:9.2f} ms  "
+            f"{count / seconds:12,.0f} tokens/s  {baseline / seconds:5.2f}x"
+        )
+
+
+def bench_parallel_lexing(source: str, repeat: int) -> None:
+    """Serial scan vs lex_parallel with 1, 2, 4, ... worker processes."""
+    job_counts = [1]
+    while job_counts[-1] < max(os.cpu_count() or 1, 4):
+        job_counts.append(job_counts[-1] * 2)
+    print(f"Parallel lexing ({os.cpu_count()} CPUs), best of {repeat}:")
+    serial = time_best(lambda: lex(source, Scanner, CompilationContext()), repeat)
+    print(f"  {'serial':<10} {serial * 1000:9.2f} ms  {1:5.2f}x")
+    for jobs in job_counts:
+        seconds = time_best(
+            lambda: lex_parallel(source, CompilationContext(), jobs, Scanner, min_chunk_size=1), repeat
+        )
+        print(f"  {f'{jobs} jobs':<10} {seconds * 1000:9.2f} ms  {serial / seconds:5.2f}x")
+
+
+def bench_parsers(tokens: TokenBuffer, repeat: int) -> None:
+    engines = [
+        ("recursive", Parser),
+        ("stack", StackParser),
+        ("generated", load_generated_parser()),
+    ]
+    print(f"Parsing {len(tokens)} pre-lexed tokens, best of {repeat}:")
+    baseline = None
+    for name, parser_class in engines:
+        def run():
+            parser_class(tokens.reader()).parse()
+
+        seconds = time_best(run, repeat)
+        baseline = baseline or seconds
+        print(
+            f"  {name:<10} {seconds * 1000:9.2f} ms  "
+            f"{len(tokens) / seconds:12,.0f} tokens/s  {baseline / seconds:5.2f}x"
+        )
+
+
+def bench_parallel_parsing(tokens: TokenBuffer, repeat: int) -> None:
+    """Serial parse into an arena vs ParallelParser with 1, 2, 4, ... worker processes."""
+    job_counts = [1]
+    while job_counts[-1] < max(os.cpu_count() or 1, 4):
+        job_counts.append(job_counts[-1] * 2)
+    print(f"Parallel parsing ({os.cpu_count()} CPUs), best of {repeat}:")
+    serial = time_best(lambda: Parser(tokens.reader(), ParseTreeArena()).parse(), repeat)
+    print(f"  {'serial':<10} {serial * 1000:9.2f} ms  {1:5.2f}x")
+    for jobs in job_counts:
+        seconds = time_best(lambda: ParallelParser(tokens, jobs=jobs, min_chunk_tokens=1).parse(), repeat)
+        print(f"  {f'{jobs} jobs':<10} {seconds * 1000:9.2f} ms  {serial / seconds:5.2f}x")
+
+
+def count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def bench_tree_memory(tokens: TokenBuffer) -> None:
+    """Memory held by the finished parse tree, ParseNode objects vs ParseTreeArena."""
+    print("Parse tree memory:")
+    results = {}
+    for name, make_arena in (("objects", lambda: None), ("arena", ParseTreeArena)):
+        tracemalloc.start()
+        arena = make_arena()
+        tree, _ = StackParser(tokens.reader(), arena).parse()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        nodes = len(arena) if arena is not None else count_nodes(tree)
+        results[name] = held / nodes
+        print(f"  {name:<10} {held / 1024:9.0f} KiB  {nodes:8,} nodes  {held / nodes:6.1f} bytes/node")
+    saved = results["objects"] - results["arena"]
+    print(f"  saved      {saved:6.1f} bytes/node ({saved / results['objects']:.0%})")
+
+
+def bench_validation(tokens: TokenBuffer, repeat: int) -> None:
+    """Full parse vs validation-only parse: time and peak traced memory."""
+    engines = [
+        ("recursive", Parser),
+        ("stack", StackParser),
+        ("generated", load_generated_parser()),
+    ]
+    print("Full parse vs validation only (build_tree=False):")
+    for name, parser_class in engines:
+        for mode, build_tree in (("full", True), ("validate", False)):
+            def run():
+                parser_class(tokens.reader(), build_tree=build_tree).parse()
+
+            seconds = time_best(run, repeat)
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"  {name:<10} {mode:<9} {seconds * 1000:9.2f} ms  "
+                f"{len(tokens) / seconds:12,.0f} tokens/s  {peak / 1024:9.0f} KiB peak"
+            )
+
+
+def declared_names(root) -> list:
+    """IDs declared by Declaration-initial nodes, found by walking a finished parse tree."""
+    names = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.name == "Declaration-initial" and len(node.children) == 2:
+            names.append(node.children[1].name)
+        stack.extend(reversed(node.children))
+    return names
+
+
+def bench_semantic_actions(tokens: TokenBuffer, repeat: int) -> None:
+    """Collecting declared names with a semantic action during the parse vs a walk of the tree."""
+    production = next(
+        prod_num for (nt, prod_num) in Parser(None).productions if nt == "Declaration-initial"
+    )
+
+    def walk():
+        parser = Parser(tokens.reader())
+        parser.parse()
+        declared_names(parser.parse_tree)
+
+    def one_pass():
+        actions = SemanticActions()
+        actions.bind(production, 2, lambda stack, token: stack.push(token.token_string))
+        Parser(tokens.reader(), build_tree=False, actions=actions).parse()
+
+    print(f"Declared names of {len(tokens)} tokens, best of {repeat}:")
+    tree = time_best(walk, repeat)
+    print(f"  {'tree walk':<10} {tree * 1000:9.2f} ms  {1:5.2f}x")
+    seconds = time_best(one_pass, repeat)
+    print(f"  {'actions':<10} {seconds * 1000:9.2f} ms  {tree / seconds:5.2f}x")
+
+
+def stress_panic_recovery(count: int) -> None:
+    """Parse `count` illegal tokens in a row with each engine: panic mode must not recurse per token."""
+    engines = [
+        ("recursive", Parser),
+        ("stack", StackParser),
+        ("generated", load_generated_parser()),
+    ]
+    tokens = TokenBuffer.lex("int x;\n" + "else " * count)
+    print(f"Panic mode over {count:,} illegal tokens:")
+    for name, parser_class in engines:
+        start = time.perf_counter()
+        _, errors = parser_class(tokens.reader(), build_tree=False).parse()
+        seconds = time.perf_counter() - start
+        # One "illegal else" per token, then "Unexpected EOF"
+        if len(errors) != count + 1:
+            raise RuntimeError(f"{name}: expected {count + 1} syntax errors, got {len(errors)}")
+        print(f"  {name:<10} {seconds * 1000:9.2f} ms  {count / seconds:12,.0f} tokens/s")
+
+
+def bench_incremental(source: str, repeat: int) -> None:
+    """Full lex and parse vs incremental re-lex and reparse after a one-character edit mid-source."""
+    print(f"Incremental edit of {len(source):,} characters, best of {repeat}:")
+    full = time_best(lambda: Parser(TokenBuffer.lex(source).reader()).parse(), repeat)
+    print(f"  {'full':<12} {full * 1000:9.2f} ms  {1:5.2f}x")
+
+    lexer = IncrementalLexer(source)
+    parser = IncrementalParser()
+    parser.reparse(lexer.get_tokens())
+    middle = len(source) // 2
+    # Insert a space and remove it again, so every run starts from the same source
+    edits = cycle([(middle, middle, " "), (middle, middle + 1, "")])
+
+    def run():
+        start, end, replacement = next(edits)
+        parser.reparse(lexer.edit(start, end, replacement))
+
+    seconds = time_best(run, repeat)
+    print(f"  {'incremental':<12} {seconds * 1000:9.2f} ms  {full / seconds:5.2f}x")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="C-minus front-end benchmarks")
+    arg_parser.add_argument("input", nargs="?", help="C-minus source file (default: synthetic)")
+    arg_parser.add_argument("--functions", type=int, default=500, help="functions in the synthetic program")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    arg_parser.add_argument(
+        "--illegal-tokens", type=int, default=1_000_000, help="illegal tokens in the panic mode stress test"
+    )
+    args = arg_parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            source = f.read()
+    else:
+        source = synthetic_program(args.functions)
+
+    bench_scanners(source, args.repeat)
+    bench_parallel_lexing(source, args.repeat)
+    tokens = TokenBuffer.lex(source)
+    bench_parsers(tokens, args.repeat)
+    bench_parallel_parsing(tokens, args.repeat)
+    bench_tree_memory(tokens)
+    bench_validation(tokens, args.repeat)
+    bench_semantic_actions(tokens, args.repeat)
+    bench_incremental(source, args.repeat)
+    stress_panic_recovery(args.illegal_tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 # Amir Hossein Ravan Nakhjavani - 400104975
 # Maedeh Heydari - 400104918
 
+import argparse
 import logging
+import time
 
+from context import CompilationContext
+from error import ErrorBudget
+from parallel_lexer import lex_parallel
+from parallel_parser import ParallelParser
 from scanner import Scanner
+from regex_scanner import RegexScanner
 from parser import Parser
-from tables import error_table, symbol_table, token_table
+from parser_generator import load_generated_parser
+from stack_parser import StackParser
+from token_buffer import TokenBuffer
+from tree_arena import ParseTreeArena
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,29 +23,149 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SCANNER_ENGINES = {
+    "char": Scanner,
+    "regex": RegexScanner,
+}
+
+# Engine name -> function returning the parser class
+PARSER_ENGINES = {
+    "recursive": lambda: Parser,
+    "stack": lambda: StackParser,
+    "generated": load_generated_parser,
+}
+
+
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="C-minus compiler")
+    arg_parser.add_argument(
+        "--engine",
+        choices=sorted(PARSER_ENGINES),
+        default="recursive",
+        help="parsing engine: recursive descent, explicit-stack table-driven "
+        "or generated from grammar.txt",
+    )
+    arg_parser.add_argument(
+        "--scanner",
+        choices=sorted(SCANNER_ENGINES),
+        default="char",
+        help="scanning engine: character by character or a compiled master regex",
+    )
+    arg_parser.add_argument(
+        "--no-tokens",
+        action="store_true",
+        help="do not record tokens or write tokens.txt",
+    )
+    arg_parser.add_argument(
+        "--tree-arena",
+        action="store_true",
+        help="store the parse tree in compact parallel arrays instead of node objects",
+    )
+    arg_parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="only check syntax: build no parse tree and do not write parse_tree.txt",
+    )
+    arg_parser.add_argument(
+        "--prelex",
+        action="store_true",
+        help="scan the whole input into a token buffer before parsing, and log both times",
+    )
+    arg_parser.add_argument(
+        "--lex-jobs",
+        type=int,
+        metavar="N",
+        help="scan the input in N worker processes (implies --prelex)",
+    )
+    arg_parser.add_argument(
+        "--parse-jobs",
+        type=int,
+        metavar="N",
+        help="parse top-level declarations in N worker processes with the recursive engine "
+        "and a tree arena (implies --prelex)",
+    )
+    arg_parser.add_argument(
+        "--max-lexical-errors",
+        type=int,
+        metavar="N",
+        help="stop compiling after N lexical errors",
+    )
+    arg_parser.add_argument(
+        "--max-syntax-errors",
+        type=int,
+        metavar="N",
+        help="stop compiling after N syntax errors",
+    )
+    arg_parser.add_argument(
+        "--max-error-bytes",
+        type=int,
+        metavar="N",
+        help="stop compiling once the error files would exceed N bytes",
+    )
+    args = arg_parser.parse_args()
+    if args.tree_arena and args.validate_only:
+        arg_parser.error("--tree-arena and --validate-only cannot be combined")
+    if args.parse_jobs and args.engine != "recursive":
+        arg_parser.error("--parse-jobs only works with the recursive engine")
+    return args
+
 
 def main():
+    args = parse_args()
+
     try:
-        with open("input.txt", "r", encoding="utf-8") as f:
-            content = f.read()
+        source = open("input.txt", "r", encoding="utf-8")
     except FileNotFoundError:
         logger.error("Error: input.txt not found.")
         return
 
-    scanner = Scanner(content)
-    parser = Parser(scanner)
+    # The scanner reads the source in chunks rather than all at once
+    with source:
+        error_budget = ErrorBudget(args.max_lexical_errors, args.max_syntax_errors, args.max_error_bytes)
+        context = CompilationContext(record_tokens=not args.no_tokens, error_budget=error_budget)
+        scanner_class = SCANNER_ENGINES[args.scanner]
+        prelex = args.prelex or args.lex_jobs or args.parse_jobs
+        if prelex:
+            start = time.perf_counter()
+            if args.lex_jobs:
+                tokens = TokenBuffer.from_tokens(
+                    lex_parallel(source.read(), context, args.lex_jobs, scanner_class)
+                )
+            else:
+                tokens = TokenBuffer.lex(source, context, scanner_class)
+            logger.info(f"Lexed {len(tokens)} tokens in {time.perf_counter() - start:.3f} s")
+            scanner = tokens.reader()
+        else:
+            scanner = scanner_class(source, context)
+        arena = ParseTreeArena() if args.tree_arena else None
+        if args.parse_jobs:
+            parser = ParallelParser(
+                tokens, arena, build_tree=not args.validate_only, context=context, jobs=args.parse_jobs
+            )
+        else:
+            parser = PARSER_ENGINES[args.engine]()(
+                scanner, arena, build_tree=not args.validate_only, context=context
+            )
 
-    # Run parser (parser calls scanner as needed)
-    parser.parse()
+        # Run parser (parser calls scanner as needed)
+        start = time.perf_counter()
+        parser.parse()
+        if prelex:
+            logger.info(f"Parsed in {time.perf_counter() - start:.3f} s")
 
     # Export outputs for Phase 2
-    parser.export_parse_tree("parse_tree.txt")
+    if not args.validate_only:
+        parser.export_parse_tree("parse_tree.txt")
     parser.export_syntax_errors("syntax_errors.txt")
     
     # Also export scanner outputs (for Phase 1 compatibility if needed)
-    token_table.export_to_file("tokens.txt")
-    error_table.export_to_file("lexical_errors.txt")
-    symbol_table.export_to_file("symbol_table.txt")
+    note = context.error_budget.truncation_note()
+    if note:
+        logger.warning(note)
+    if not args.no_tokens:
+        context.token_table.export_to_file("tokens.txt", note)
+    context.error_table.export_to_file("lexical_errors.txt", note)
+    context.symbol_table.export_to_file("symbol_table.txt", note)
 
 
 if __name__ == "__main__":
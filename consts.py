@@ -28,3 +28,8 @@ SYMBOLS = {
 }
 
 WHITESPACE = {" ", "\t", "\n", "\r", "\v", "\f"}
+
+# Integer IDs of the parser's terminals: end marker, token classes,
+# then one ID per keyword and per symbol
+TERMINALS = ("$", "ID", "NUM") + tuple(sorted(KEYWORDS)) + tuple(sorted(SYMBOLS))
+TERMINAL_IDS = {name: terminal for terminal, name in enumerate(TERMINALS)}
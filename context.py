@@ -0,0 +1,19 @@
+from error import ErrorBudget
+from tables import ErrorTable, SymbolTable, TokenTable
+
+
+class CompilationContext:
+    """
+    State of one compilation: the token, lexical error and symbol tables, the
+    syntax errors and the error budget. Scanner and Parser write only into the
+    context they are given, so separate compilations can run concurrently.
+    """
+
+    def __init__(self, record_tokens: bool = True, error_budget: ErrorBudget = None) -> None:
+        self.symbol_table = SymbolTable()
+        # Without record_tokens only the symbol table is kept, for callers that skip tokens.txt
+        self.token_table = TokenTable(self.symbol_table, record_tokens)
+        # Unlimited unless given: caps errors and stops the compilation past them
+        self.error_budget = error_budget if error_budget is not None else ErrorBudget()
+        self.error_table = ErrorTable(self.error_budget)
+        self.syntax_errors = []
@@ -10,11 +10,100 @@ class LeximErrorType(Enum):
 
 
 class LeximError:
-    def __init__(self, line: int, lexeme: str, error_type: LeximErrorType):
+    def __init__(self, line: int, lexeme: str, error_type: LeximErrorType, column: int = None):
         self.line = line
+        self.column = column
         self.lexeme = lexeme
         self.error_type = error_type
         self.message = error_type.value
 
     def __str__(self):
         return f"{self.line} ({self.lexeme}, {self.message})"
+
+
+class ErrorBudget:
+    """
+    Caps on the lexical errors, syntax errors and bytes of error text one
+    compilation records (None: no cap). The first error over a cap is dropped
+    and sets `exceeded`, after which scanning and parsing stop.
+    """
+
+    def __init__(self, max_lexical_errors: int = None, max_syntax_errors: int = None, max_error_bytes: int = None):
+        self.max_lexical_errors = max_lexical_errors
+        self.max_syntax_errors = max_syntax_errors
+        self.max_error_bytes = max_error_bytes
+        self.lexical_errors = 0
+        self.syntax_errors = 0
+        self.error_bytes = 0
+        self.syntax_error_bytes = 0
+        # Which cap was exceeded, once one is, and by which kind of error
+        self.exceeded = None
+        self.exceeded_by = None
+
+    @property
+    def limited(self) -> bool:
+        """Whether any cap is set."""
+        return (
+            self.max_lexical_errors is not None
+            or self.max_syntax_errors is not None
+            or self.max_error_bytes is not None
+        )
+
+    def _allow(self, count: int, limit: int, kind: str, text: str) -> int:
+        """Size of the error in bytes if it may be recorded, else None."""
+        if self.exceeded is not None:
+            return None
+        if limit is not None and count >= limit:
+            self.exceeded = f"more than {limit} {kind} errors"
+            self.exceeded_by = kind
+            return None
+        # As written to the export file, with its newline
+        size = len(text.encode("utf-8")) + 1 if self.max_error_bytes is not None else 0
+        if self.max_error_bytes is not None and self.error_bytes + size > self.max_error_bytes:
+            self.exceeded = f"more than {self.max_error_bytes} bytes of errors"
+            self.exceeded_by = kind
+            return None
+        self.error_bytes += size
+        return size
+
+    def allow_lexical_error(self, text: str) -> bool:
+        """Whether a lexical error, formatted as text, may be recorded."""
+        if self._allow(self.lexical_errors, self.max_lexical_errors, "lexical", text) is None:
+            return False
+        self.lexical_errors += 1
+        return True
+
+    def allow_syntax_error(self, text: str) -> bool:
+        """Whether a syntax error, formatted as text, may be recorded."""
+        size = self._allow(self.syntax_errors, self.max_syntax_errors, "syntax", text)
+        if size is None:
+            return False
+        self.syntax_errors += 1
+        self.syntax_error_bytes += size
+        return True
+
+    def reset_syntax_errors(self) -> None:
+        """Forget the syntax errors counted so far, for a parser starting over."""
+        self.error_bytes -= self.syntax_error_bytes
+        self.syntax_errors = 0
+        self.syntax_error_bytes = 0
+        if self.exceeded_by == "syntax":
+            self.exceeded = self.exceeded_by = None
+
+    def truncation_note(self) -> str:
+        """Last line for every export file once a cap was exceeded, else None."""
+        if self.exceeded is None:
+            return None
+        return f"Output truncated: {self.exceeded}, the rest of the input was skipped."
+
+
+class ParseError:
+    """A syntax error at the line and column of the lookahead token."""
+
+    def __init__(self, line: int, column: int, message: str):
+        self.line = line
+        self.column = column
+        self.message = message
+
+    def __str__(self):
+        return f"#{self.line} : syntax error, {self.message}"
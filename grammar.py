@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import marshal
+import os
+
+logger = logging.getLogger(__name__)
+
+EPSILON = "ε"
+END_MARKER = "$"
+ARROW = "→"
+
+GRAMMAR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grammar.txt")
+
+# Bump when the cached layout or the set algorithms change
+CACHE_VERSION = 1
+
+
+class Grammar:
+    """A context-free grammar with its FIRST, FOLLOW and predict sets."""
+
+    def __init__(self, productions: dict, first_sets: dict, follow_sets: dict, predict_sets: dict):
+        # {(non_terminal, prod_num): right-hand side tuple}, ε is an empty tuple
+        self.productions = productions
+        self.first_sets = first_sets
+        self.follow_sets = follow_sets
+        self.predict_sets = predict_sets
+        self.start_symbol = next(iter(productions))[0]
+        self.non_terminals = list(dict.fromkeys(nt for nt, _ in productions))
+        # SHA-256 of the grammar text, set by load_grammar
+        self.key = None
+
+    @classmethod
+    def from_text(cls, text: str) -> "Grammar":
+        productions = parse_productions(text)
+        first_sets = compute_first_sets(productions)
+        follow_sets = compute_follow_sets(productions, first_sets)
+        predict_sets = compute_predict_sets(productions, first_sets, follow_sets)
+        return cls(productions, first_sets, follow_sets, predict_sets)
+
+    def to_cache(self) -> tuple:
+        return (self.productions, self.first_sets, self.follow_sets, self.predict_sets)
+
+
+def parse_productions(text: str) -> dict:
+    """Parse 'A → X Y Z' lines into {(A, prod_num): (X, Y, Z)}."""
+    productions = {}
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if ARROW not in line:
+            raise ValueError(f"Grammar line {lineno}: expected '{ARROW}' in '{line}'")
+        lhs, rhs = line.split(ARROW, 1)
+        lhs = lhs.strip()
+        symbols = tuple(s for s in rhs.split() if s != EPSILON)
+        productions[(lhs, len(productions) + 1)] = symbols
+    if not productions:
+        raise ValueError("Grammar has no productions")
+    return productions
+
+
+def _first_of_sequence(symbols, first_sets: dict) -> set:
+    """FIRST of a sequence of grammar symbols (contains ε if all are nullable)."""
+    result = set()
+    for symbol in symbols:
+        symbol_first = first_sets.get(symbol, {symbol})
+        result |= symbol_first - {EPSILON}
+        if EPSILON not in symbol_first:
+            return result
+    result.add(EPSILON)
+    return result
+
+
+def compute_first_sets(productions: dict) -> dict:
+    """Compute FIRST sets of all non-terminals by fixpoint iteration."""
+    first_sets = {nt: set() for nt, _ in productions}
+    changed = True
+    while changed:
+        changed = False
+        for (nt, _), rhs in productions.items():
+            before = len(first_sets[nt])
+            first_sets[nt] |= _first_of_sequence(rhs, first_sets)
+            if len(first_sets[nt]) != before:
+                changed = True
+    return {nt: frozenset(s) for nt, s in first_sets.items()}
+
+
+def compute_follow_sets(productions: dict, first_sets: dict) -> dict:
+    """Compute FOLLOW sets of all non-terminals by fixpoint iteration."""
+    follow_sets = {nt: set() for nt, _ in productions}
+    start_symbol = next(iter(productions))[0]
+    follow_sets[start_symbol].add(END_MARKER)
+    changed = True
+    while changed:
+        changed = False
+        for (nt, _), rhs in productions.items():
+            for i, symbol in enumerate(rhs):
+                if symbol not in follow_sets:
+                    continue
+                before = len(follow_sets[symbol])
+                rest_first = _first_of_sequence(rhs[i + 1:], first_sets)
+                follow_sets[symbol] |= rest_first - {EPSILON}
+                if EPSILON in rest_first:
+                    follow_sets[symbol] |= follow_sets[nt]
+                if len(follow_sets[symbol]) != before:
+                    changed = True
+    return {nt: frozenset(s) for nt, s in follow_sets.items()}
+
+
+def compute_predict_sets(productions: dict, first_sets: dict, follow_sets: dict) -> dict:
+    """Predict(A → α) = FIRST(α) - {ε}, plus FOLLOW(A) when α is nullable."""
+    predict_sets = {}
+    for (nt, prod_num), rhs in productions.items():
+        rhs_first = _first_of_sequence(rhs, first_sets)
+        predict = rhs_first - {EPSILON}
+        if EPSILON in rhs_first:
+            predict |= follow_sets[nt]
+        predict_sets[(nt, prod_num)] = frozenset(predict)
+    return predict_sets
+
+
+# {path: ((mtime, size), Grammar)} so repeated loads skip reading and hashing
+_loaded = {}
+
+
+def load_grammar(path: str = GRAMMAR_FILE, cache_path: str = None) -> Grammar:
+    """
+    Load a grammar file, reusing computed sets from an on-disk cache.
+    The cache is keyed by a hash of the grammar text and rebuilt when stale.
+    Grammars are also memoized per process, so repeated Parser() construction is cheap.
+    """
+    stat = os.stat(path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    loaded = _loaded.get(path)
+    if loaded is not None and loaded[0] == stat_key:
+        return loaded[1]
+
+    if cache_path is None:
+        cache_path = os.path.splitext(path)[0] + ".cache"
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    key = hashlib.sha256(raw).hexdigest()
+
+    grammar = _read_cache(cache_path, key)
+    if grammar is None:
+        grammar = Grammar.from_text(raw.decode("utf-8"))
+        _write_cache(cache_path, key, grammar)
+    grammar.key = key
+
+    _loaded[path] = (stat_key, grammar)
+    return grammar
+
+
+def _read_cache(cache_path: str, key: str):
+    try:
+        with open(cache_path, "rb") as f:
+            version, cached_key, data = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != CACHE_VERSION or cached_key != key:
+        return None
+    return Grammar(*data)
+
+
+def _write_cache(cache_path: str, key: str, grammar: Grammar) -> None:
+    # Write to a temporary file and rename, so concurrent runs never see a partial cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            marshal.dump((CACHE_VERSION, key, grammar.to_cache()), f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write grammar cache {cache_path}: {e}")
@@ -0,0 +1,241 @@
+"""Incremental re-lexing for editor integration.
+
+IncrementalLexer keeps the tokens, lexical errors and block comments of a
+source together with the offsets where they end. After an edit it restarts
+the scanner at the nearest checkpoint before the edit (a line start with no
+block comment open) and scans the new text until a token on a line after the
+edit ends where an old token ended, shifted by the edit. From there on both
+scans would be identical, so the old tokens and errors are reused with their
+line numbers moved. The context's tables are updated in place and end up as
+after a full scan of the new text.
+"""
+
+from bisect import bisect_right
+
+from context import CompilationContext
+from scanner import T_EOF, Scanner
+from tokens import Token, TokenType
+
+
+class _UnitRecorder:
+    """Token and error table stand-in that keeps each token and error with the offset where it ends."""
+
+    def __init__(self):
+        self.scanner = None
+        self.tokens = []
+        self.token_ends = []
+        self.errors = []
+        self.error_ends = []
+
+    def add_token(self, token: Token) -> None:
+        self.tokens.append(token)
+        self.token_ends.append(self.scanner.cursor)
+
+    def add_error(self, error) -> None:
+        self.errors.append(error)
+        self.error_ends.append(self.scanner.cursor)
+
+
+def _line_breaks(text: str) -> int:
+    return text.count("\n") + text.count("\f")
+
+
+class IncrementalLexer:
+    """
+    Token stream of a source that is kept up to date through edit(), which
+    re-lexes only around the edited range.
+    """
+
+    def __init__(self, text: str, context: CompilationContext = None, scanner_class=Scanner):
+        self.context = context if context is not None else CompilationContext()
+        if self.context.error_budget.limited:
+            # Rescans replace errors anywhere in the source, which a budget counting up to a cap cannot follow
+            raise ValueError("IncrementalLexer does not support a limited error budget")
+        self.scanner_class = scanner_class
+        self.text = text
+
+        self.scanner, recorder = self._start(text, 0)
+        self.eof = self._scan_to(recorder, None)
+        self.tokens = recorder.tokens
+        self.token_ends = recorder.token_ends
+        self.errors = recorder.errors
+        self.error_ends = recorder.error_ends
+
+        # Number of occurrences of each ID, to know when one appears or disappears,
+        # and number of IDs with each lowercase spelling
+        self.id_counts = {}
+        self.lower_counts = {}
+        for token in self.tokens:
+            self.context.token_table.add_token(token)
+            if token.token_type == TokenType.ID:
+                symbol = token.token_string
+                if symbol not in self.id_counts:
+                    self.id_counts[symbol] = 0
+                    self.lower_counts[symbol.lower()] = self.lower_counts.get(symbol.lower(), 0) + 1
+                self.id_counts[symbol] += 1
+        for error in self.errors:
+            self.context.error_table.add_error(error)
+
+    def _start(self, text: str, offset: int):
+        """A scanner over text, recording into a _UnitRecorder and continuing at offset."""
+        recorder = _UnitRecorder()
+        context = CompilationContext(record_tokens=False)
+        context.token_table = recorder
+        context.error_table = recorder
+        scanner = self.scanner_class(text, context)
+        scanner.comments = []
+        scanner.cursor = offset
+        recorder.scanner = scanner
+        return scanner, recorder
+
+    def _scan_to(self, recorder: _UnitRecorder, sync) -> Token:
+        """
+        Scan until sync(token end) is true for a token and return None, or
+        until EOF and return the EOF token.
+        """
+        get_next_token = recorder.scanner.get_next_token
+        token_ends = recorder.token_ends
+        while True:
+            token = get_next_token()
+            if token.terminal == T_EOF:
+                return token
+            if sync is not None and sync(token, token_ends[-1]):
+                return None
+
+    def get_tokens(self) -> list[Token]:
+        return self.tokens + [self.eof]
+
+    def edit(self, start: int, end: int, replacement: str) -> list[Token]:
+        """
+        Replace text[start:end] with replacement, re-lexing from the nearest
+        checkpoint before the edit until the token stream resynchronizes.
+        Returns the new token list, EOF included.
+        """
+        old_text = self.text
+        text = old_text[:start] + replacement + old_text[end:]
+        delta = len(replacement) - (end - start)
+        edit_end = start + len(replacement)
+        line_delta = _line_breaks(replacement) - _line_breaks(old_text[start:end])
+
+        checkpoint = self.scanner.checkpoint_before(start)
+        restart = checkpoint.offset
+        scanner, recorder = self._start(text, restart)
+        edit_end_line = bisect_right(scanner.line_starts, edit_end)
+
+        # Resynchronize on a token past the edit, on a later line (so that the
+        # columns of what follows are unchanged), that ends where an old token
+        # ended: from such a point the rest of the text and the scan are the same
+        old_ends = self.token_ends
+        synced = []
+
+        def sync(token, token_end):
+            if token_end < edit_end or token.line_number <= edit_end_line:
+                return False
+            old_end = token_end - delta
+            i = bisect_right(old_ends, old_end) - 1
+            if i >= 0 and old_ends[i] == old_end:
+                synced.append(i)
+                return True
+            return False
+
+        eof = self._scan_to(recorder, sync)
+        if synced:
+            keep_from = synced[0] + 1
+            sync_end = old_ends[synced[0]]
+            last_line = self.tokens[synced[0]].line_number
+            eof = self.eof
+            eof.line_number += line_delta
+        else:
+            keep_from = len(self.tokens)
+            sync_end = len(old_text)
+            # The EOF token is on the last line
+            last_line = self.eof.line_number
+
+        # Tokens: keep those before the checkpoint, splice in the rescanned
+        # ones, then the rest with their lines moved
+        first = bisect_right(old_ends, restart)
+        removed = self.tokens[first:keep_from]
+        tail = self.tokens[keep_from:]
+        for token in tail:
+            token.line_number += line_delta
+        self.tokens[first:] = recorder.tokens + tail
+        self.token_ends[first:] = recorder.token_ends + [token_end + delta for token_end in old_ends[keep_from:]]
+        self.eof = eof
+
+        # Lexical errors, likewise
+        error_first = bisect_right(self.error_ends, restart)
+        error_keep_from = bisect_right(self.error_ends, sync_end)
+        error_tail = self.errors[error_keep_from:]
+        for error in error_tail:
+            error.line += line_delta
+        if line_delta:
+            self.context.error_table.splice(error_first, len(self.errors), recorder.errors + error_tail)
+        else:
+            self.context.error_table.splice(error_first, error_keep_from, recorder.errors)
+        self.errors[error_first:] = recorder.errors + error_tail
+        self.error_ends[error_first:] = recorder.error_ends + [
+            error_end + delta for error_end in self.error_ends[error_keep_from:]
+        ]
+
+        # Block comments, likewise
+        comments = self.scanner.comments
+        comment_first = bisect_right(comments, (restart, restart))
+        comment_keep_from = bisect_right(comments, (sync_end, sync_end))
+        scanner.comments = (
+            comments[:comment_first]
+            + scanner.comments
+            + [(comment_start + delta, comment_end + delta) for comment_start, comment_end in comments[comment_keep_from:]]
+        )
+
+        # Token table: lines from the checkpoint to the resynchronized token
+        spliced_last = last_line + line_delta
+        token_table = self.context.token_table
+        lines_end = len(self.tokens)
+        lines_start = first
+        while lines_end > lines_start and self.tokens[lines_end - 1].line_number > spliced_last:
+            lines_end -= 1
+        token_table.splice(checkpoint.line, last_line, line_delta, self.tokens[lines_start:lines_end])
+
+        self._update_symbols(removed, recorder.tokens)
+        self.text = text
+        self.scanner = scanner
+        return self.get_tokens()
+
+    def _update_symbols(self, removed: list[Token], added: list[Token]) -> None:
+        """Update the symbol table for IDs that disappeared from or first appeared in the source."""
+        id_counts = self.id_counts
+        lower_counts = self.lower_counts
+        changed = set()
+        for token in removed:
+            if token.token_type == TokenType.ID:
+                id_counts[token.token_string] -= 1
+                changed.add(token.token_string)
+        for token in added:
+            if token.token_type == TokenType.ID:
+                symbol = token.token_string
+                if symbol not in id_counts:
+                    id_counts[symbol] = 0
+                    lower_counts[symbol.lower()] = lower_counts.get(symbol.lower(), 0) + 1
+                id_counts[symbol] += 1
+                changed.add(symbol)
+
+        symbol_table = self.context.symbol_table
+        appeared = []
+        for symbol in changed:
+            if id_counts[symbol] == 0:
+                del id_counts[symbol]
+                lower_counts[symbol.lower()] -= 1
+                symbol_table.remove_symbol(symbol)
+            elif symbol not in symbol_table:
+                appeared.append(symbol)
+
+        # IDs only differing in case are exported in order of first appearance,
+        # which may have changed for them: find it with a pass over the tokens
+        if any(lower_counts.get(symbol.lower(), 0) > 1 for symbol in changed):
+            symbol_table.clear()
+            for token in self.tokens:
+                if token.token_type == TokenType.ID:
+                    symbol_table.add_symbol(token.token_string)
+        else:
+            for symbol in appeared:
+                symbol_table.add_symbol(symbol)
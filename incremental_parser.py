@@ -0,0 +1,222 @@
+"""Incremental reparsing at top-level declaration granularity.
+
+IncrementalParser remembers, for each top-level Declaration subtree of its
+last parse, the tokens it was parsed from (up to and including the lookahead
+it stopped at) and the syntax errors it reported. Parsing a Declaration only
+depends on those tokens, so when a new token stream has them unchanged, in
+its common prefix or common suffix with the old stream, the subtree and its
+errors are reused instead of parsed again. Everything else, including the
+Declaration-list spine and any panic mode between declarations, is parsed as
+usual, so the tree and syntax errors are the same as after a full parse.
+"""
+
+from context import CompilationContext
+from error import ParseError
+from parser import T_EOF, ParseNode, Parser
+from token_buffer import TokenBuffer
+from tokens import Token
+from tree_arena import ParseTreeArena
+
+# Tokens compared per slice when looking for the common prefix and suffix
+_BLOCK = 4096
+
+
+class ParsedDeclaration:
+    """A top-level Declaration subtree with the tokens and syntax errors it came from."""
+
+    __slots__ = ("start", "end", "node", "errors", "unexpected_eof")
+
+    def __init__(self, start: int, end: int, node: ParseNode, errors: list[ParseError], unexpected_eof: bool):
+        # Token indexes of its first token and of the lookahead after it
+        self.start = start
+        self.end = end
+        self.node = node
+        self.errors = errors
+        self.unexpected_eof = unexpected_eof
+
+
+def _same(old: TokenBuffer, new: TokenBuffer, i: int, j: int, count: int, line_delta: int) -> bool:
+    """Whether old tokens i... and new tokens j... agree for count tokens, lines moved by line_delta."""
+    if old.terminals[i:i + count] != new.terminals[j:j + count]:
+        return False
+    if old.columns[i:i + count] != new.columns[j:j + count]:
+        return False
+    if old.lexemes[i:i + count] != new.lexemes[j:j + count]:
+        return False
+    old_lines = old.lines[i:i + count]
+    if line_delta:
+        old_lines = [line + line_delta for line in old_lines]
+        return old_lines == new.lines[j:j + count].tolist()
+    return old_lines == new.lines[j:j + count]
+
+
+def _common_prefix(old: TokenBuffer, new: TokenBuffer, limit: int) -> int:
+    length = 0
+    while length < limit:
+        count = min(_BLOCK, limit - length)
+        if not _same(old, new, length, length, count, 0):
+            while _same(old, new, length, length, 1, 0):
+                length += 1
+            break
+        length += count
+    return length
+
+
+def _common_suffix(old: TokenBuffer, new: TokenBuffer, limit: int, line_delta: int) -> int:
+    old_end = len(old)
+    new_end = len(new)
+    length = 0
+    while length < limit:
+        count = min(_BLOCK, limit - length)
+        if not _same(old, new, old_end - length - count, new_end - length - count, count, line_delta):
+            while _same(old, new, old_end - length - 1, new_end - length - 1, 1, line_delta):
+                length += 1
+            break
+        length += count
+    return length
+
+
+class IncrementalParser(Parser):
+    """
+    Recursive-descent Parser that keeps its parse tree and token stream
+    between calls to reparse(), reusing the top-level Declaration subtrees
+    an edit did not touch by reference. With an arena, the nodes of
+    replaced subtrees stay in it.
+    """
+
+    def __init__(
+        self,
+        context: CompilationContext = None,
+        arena: ParseTreeArena = None,
+        build_tree: bool = True,
+    ):
+        super().__init__(None, arena, build_tree, context)
+        self.tokens = None
+        self.declarations = []
+        # Reusable declarations of the previous parse by their new start index
+        self._reusable = {}
+        # Compound statements entered: their declarations are never reused
+        self._depth = 0
+
+    def reparse(self, tokens: list[Token]) -> tuple[ParseNode, list[ParseError]]:
+        """
+        Parse a token stream (EOF included), the whole of it on the first call
+        and afterwards only the top-level declarations whose tokens changed.
+        With a limited error budget everything is parsed again: reused errors
+        would not be counted against it, nor would the parse stop at its cap.
+        """
+        new = TokenBuffer.from_tokens(tokens)
+        old = self.tokens
+        if old is None or self.context.error_budget.limited:
+            return self._parse_tokens(new, {})
+        return self._parse_tokens(new, self._find_reusable(old, new))
+
+    def _parse_tokens(self, tokens: TokenBuffer, reusable: dict) -> tuple[ParseNode, list[ParseError]]:
+        """Parse a token buffer, taking the ParsedDeclaration in reusable by start index wherever one starts."""
+        self.tokens = tokens
+        self.declarations = []
+        self.scanner = tokens.reader()
+        self.syntax_errors.clear()
+        self.context.error_budget.reset_syntax_errors()
+        self.eof_error_reported = False
+        self.unexpected_eof = False
+        self._depth = 0
+        self._reusable = reusable
+        try:
+            return super().parse()
+        finally:
+            self._reusable = {}
+
+    def _find_reusable(self, old: TokenBuffer, new: TokenBuffer) -> dict:
+        """Previous declarations whose tokens are all in the common prefix or suffix."""
+        limit = min(len(old), len(new))
+        prefix = _common_prefix(old, new, limit)
+        # Past the edit tokens keep their columns and all move by the same number of lines
+        line_delta = new.lines[-1] - old.lines[-1]
+        suffix = _common_suffix(old, new, limit - prefix, line_delta)
+        shift = len(new) - len(old)
+        suffix_start = len(old) - suffix
+
+        reusable = {}
+        for declaration in self.declarations:
+            if declaration.end < prefix:
+                reusable[declaration.start] = declaration
+            elif declaration.start >= suffix_start:
+                errors = declaration.errors
+                if line_delta:
+                    errors = [ParseError(error.line + line_delta, error.column, error.message) for error in errors]
+                reusable[declaration.start + shift] = ParsedDeclaration(
+                    declaration.start + shift,
+                    declaration.end + shift,
+                    declaration.node,
+                    errors,
+                    declaration.unexpected_eof,
+                )
+        return reusable
+
+    def _token_index(self) -> int:
+        """Index of the current token in the token stream."""
+        reader = self.scanner
+        return reader.last if self.current_token.terminal == T_EOF else reader.index - 1
+
+    def compound_stmt(self) -> ParseNode:
+        self._depth += 1
+        node = super().compound_stmt()
+        self._depth -= 1
+        return node
+
+    def declaration_list(self) -> ParseNode:
+        """
+        Declaration-list → Declaration Declaration-list | ε
+        At the top level the right recursion runs as a loop, so a program with
+        many declarations does not nest a call for each of them.
+        """
+        if self._depth:
+            return super().declaration_list()
+        if self.unexpected_eof:
+            return None
+        root = parent = None
+        while True:
+            node = self.new_node("Declaration-list")
+            prod_num = self._predict_or_recover("Declaration-list")
+            if prod_num is None and self.unexpected_eof:
+                # Skipped in panic mode
+                break
+            if parent is None:
+                root = node
+            else:
+                parent.add_child(node)
+            if prod_num != 2:  # ε, or skipped in panic mode
+                node.add_child(self.new_node("epsilon", is_terminal=True))
+                break
+            # Declaration Declaration-list
+            node.add_child(self.declaration())
+            if self.unexpected_eof:
+                break
+            parent = node
+        return root
+
+    def declaration(self) -> ParseNode:
+        if self._depth or self.unexpected_eof:
+            return super().declaration()
+
+        start = self._token_index()
+        declaration = self._reusable.get(start)
+        if declaration is not None:
+            # Same tokens as before: take the old subtree and errors, continue after it
+            self.syntax_errors.extend(declaration.errors)
+            self.unexpected_eof = self.eof_error_reported = declaration.unexpected_eof
+            self.scanner.index = declaration.end
+            self.current_token = self.scanner.get_next_token()
+        else:
+            errors_start = len(self.syntax_errors)
+            node = super().declaration()
+            declaration = ParsedDeclaration(
+                start,
+                self._token_index(),
+                node,
+                self.syntax_errors[errors_start:],
+                self.unexpected_eof,
+            )
+        self.declarations.append(declaration)
+        return declaration.node
@@ -0,0 +1,151 @@
+"""Parallel lexing of large C-minus sources.
+
+The source is split just after newlines that lie outside block comments, so
+every chunk starts at the beginning of a line with no comment open, and the
+chunks are scanned in worker processes. Their tokens and lexical errors are
+then replayed into the CompilationContext in source order with line numbers
+shifted, so the token, error and symbol tables come out exactly as after a
+serial scan.
+"""
+
+import os
+import re
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from consts import TERMINALS
+from context import CompilationContext
+from error import LeximError, LeximErrorType
+from scanner import T_EOF, T_ID, T_NUM, Scanner
+from tokens import TOKEN_TYPES, Token, TokenType
+
+# Sources shorter than this per worker are scanned serially
+MIN_CHUNK_SIZE = 1 << 18
+
+# Comments and stray comment closers, tried at each position like the scanner
+# does (an unclosed block comment runs to the end of the input)
+_COMMENT = re.compile(r"//[^\n\f]*|/\*(?:.*?\*/|.*)|\*/", re.DOTALL)
+
+
+class _Recorder(list):
+    """Stands in for a chunk scanner's token and error tables, keeping the objects."""
+
+    add_token = list.append
+    add_error = list.append
+
+
+def split_source(text: str, parts: int) -> list[str]:
+    """
+    Split text into at most `parts` chunks of about equal size, each ending
+    just after a newline that is not inside a block comment.
+    """
+    block_starts = []
+    block_ends = []
+    for match in _COMMENT.finditer(text):
+        if match.group().startswith("/*"):
+            block_starts.append(match.start())
+            block_ends.append(match.end())
+
+    bounds = [0]
+    for part in range(1, parts):
+        target = max(len(text) * part // parts, bounds[-1])
+        newline = text.find("\n", target)
+        while newline != -1:
+            i = bisect_right(block_starts, newline) - 1
+            if i < 0 or newline >= block_ends[i]:
+                break
+            newline = text.find("\n", block_ends[i])
+        if newline == -1 or newline + 1 == len(text):
+            break
+        bounds.append(newline + 1)
+    bounds.append(len(text))
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _lex_chunk(text: str, scanner_class=Scanner):
+    """
+    Scan one chunk on its own, with lines counted from 1. Tokens come back as
+    arrays of terminal IDs, lines and columns plus the ID and NUM lexemes,
+    which are much cheaper to send between processes than Token objects.
+    """
+    context = CompilationContext(record_tokens=False)
+    context.token_table = _Recorder()
+    context.error_table = _Recorder()
+    scanner = scanner_class(text, context)
+    eof = scanner.get_next_token()
+    while eof.terminal != T_EOF:
+        eof = scanner.get_next_token()
+
+    tokens = context.token_table
+    terminals = array("B", [token.terminal for token in tokens])
+    lines = array("i", [token.line_number for token in tokens])
+    columns = array("i", [token.column for token in tokens])
+    lexemes = [token.token_string for token in tokens if token.terminal == T_ID or token.terminal == T_NUM]
+    errors = [(error.line, error.lexeme, error.error_type, error.column) for error in context.error_table]
+    return terminals, lines, columns, lexemes, errors, (eof.line_number, eof.column)
+
+
+def lex_parallel(
+    text: str,
+    context: CompilationContext = None,
+    jobs: int = None,
+    scanner_class=Scanner,
+    min_chunk_size: int = MIN_CHUNK_SIZE,
+) -> list[Token]:
+    """
+    Scan text in up to `jobs` worker processes (default: one per CPU) and
+    return its tokens, EOF included. The tokens, lexical errors and IDs are
+    recorded in the context in source order, as a serial scan would. With an
+    error budget the scan is serial, so that it can stop at the cap.
+    """
+    context = context if context is not None else CompilationContext()
+    jobs = jobs or os.cpu_count() or 1
+    chunks = split_source(text, min(jobs, len(text) // min_chunk_size))
+    if len(chunks) == 1 or context.error_budget.limited:
+        # Too small to split, or the scan must stop at the error budget: scan serially into the context
+        scanner = scanner_class(text, context)
+        tokens = [scanner.get_next_token()]
+        while tokens[-1].terminal != T_EOF:
+            tokens.append(scanner.get_next_token())
+        return tokens
+
+    with ProcessPoolExecutor(min(jobs, len(chunks))) as executor:
+        results = list(executor.map(_lex_chunk, chunks, repeat(scanner_class)))
+
+    add_token = context.token_table.add_token
+    add_error = context.error_table.add_error
+    token_types = TOKEN_TYPES
+    all_tokens = []
+    lines = 0
+    i = 0
+    while i < len(chunks):
+        chunk = chunks[i]
+        terminals, token_lines, columns, lexemes, errors, eof = results[i]
+        # A chunk ending inside a block comment was split at an unsafe point
+        # (the comment scan does not model every scanner quirk): rescan it
+        # together with the chunks after it until the comment is closed
+        while errors and errors[-1][2] == LeximErrorType.UNCLOSED_COMMENT and i + 1 < len(chunks):
+            i += 1
+            chunk += chunks[i]
+            terminals, token_lines, columns, lexemes, errors, eof = _lex_chunk(chunk, scanner_class)
+
+        lexeme_iter = iter(lexemes)
+        for terminal, line, column in zip(terminals, token_lines, columns):
+            if terminal == T_ID or terminal == T_NUM:
+                lexeme = next(lexeme_iter)
+            else:
+                lexeme = TERMINALS[terminal]
+            token = Token(line + lines, token_types[terminal], lexeme, terminal, column=column)
+            add_token(token)
+            all_tokens.append(token)
+        for line, lexeme, error_type, column in errors:
+            add_error(LeximError(line + lines, lexeme, error_type, column))
+        eof_line, eof_column = eof
+        eof = Token(eof_line + lines, TokenType.EOF, "$", T_EOF, column=eof_column)
+        lines += chunk.count("\n") + chunk.count("\f")
+        i += 1
+
+    all_tokens.append(eof)
+    return all_tokens
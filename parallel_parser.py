@@ -0,0 +1,170 @@
+"""Parallel parsing of the top-level declarations of large C-minus programs.
+
+A pre-scan guesses where top-level declarations start: an int or void at
+brace depth 0 right after a ; or } (or at the start). The token stream is
+split at such points and worker processes parse the declarations of each
+part into a ParseTreeArena. The main process then parses the program
+serially, as IncrementalParser does (looping over the top-level
+declarations, so their number is not bounded by the recursion limit),
+taking a worker's subtree and syntax errors wherever a declaration starts
+at a token the worker started one at.
+A Declaration's parse only depends on the tokens from its start, so the
+result is the serial Parser's. Wherever a guess was wrong (say, an
+unbalanced brace) the serial parse reaches no worker result and parses that
+part itself.
+"""
+
+import os
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from consts import TERMINAL_IDS
+from context import CompilationContext
+from error import ParseError
+from grammar import load_grammar
+from incremental_parser import IncrementalParser, ParsedDeclaration
+from parser import NULL_NODE, T_EOF, ParseNode, Parser
+from token_buffer import TokenBuffer
+from tree_arena import NodeView, ParseTreeArena
+
+# Programs with fewer tokens than this per worker are parsed serially
+MIN_CHUNK_TOKENS = 1 << 14
+
+# Node names interned up front in every arena, so merging them needs no kind remapping
+ARENA_NAMES = load_grammar().non_terminals + ["epsilon", "$"]
+
+T_INT = TERMINAL_IDS["int"]
+T_VOID = TERMINAL_IDS["void"]
+_DECLARATION_ENDS = (TERMINAL_IDS[";"], TERMINAL_IDS["}"])
+_OPEN_BRACE = TERMINAL_IDS["{"]
+_CLOSE_BRACE = TERMINAL_IDS["}"]
+
+
+def declaration_starts(tokens: TokenBuffer) -> list[int]:
+    """Token indexes that look like the start of a top-level declaration."""
+    starts = []
+    depth = 0
+    previous = _DECLARATION_ENDS[0]
+    for index, terminal in enumerate(tokens.terminals):
+        if terminal == _OPEN_BRACE:
+            depth += 1
+        elif terminal == _CLOSE_BRACE:
+            depth = max(depth - 1, 0)
+        elif (terminal == T_INT or terminal == T_VOID) and depth == 0 and previous in _DECLARATION_ENDS:
+            starts.append(index)
+        previous = terminal
+    return starts
+
+
+def _slice(tokens: TokenBuffer, start: int, stop: int) -> TokenBuffer:
+    """Tokens start to stop (exclusive), ending with an EOF token if they do not already."""
+    part = TokenBuffer()
+    part.terminals = tokens.terminals[start:stop]
+    part.lines = tokens.lines[start:stop]
+    part.columns = tokens.columns[start:stop]
+    part.lexemes = tokens.lexemes[start:stop]
+    if part.terminals[-1] != T_EOF:
+        part.terminals.append(T_EOF)
+        part.lines.append(part.lines[-1])
+        part.columns.append(0)
+        part.lexemes.append("$")
+    return part
+
+
+def _parse_chunk(tokens: TokenBuffer, starts: list[int], last: int, build_tree: bool):
+    """
+    Parse the declarations of a part of the token stream from each start in
+    turn, and from wherever a declaration is directly followed by another.
+    A declaration counts only if it stopped at a lookahead up to index last:
+    past it the part's own EOF token stands in for the rest of the program.
+    Returns (start, end, root node index, syntax errors, unexpected EOF) for
+    each declaration, and the arena holding their subtrees.
+    """
+    arena = ParseTreeArena(ARENA_NAMES) if build_tree else None
+    parser = Parser(tokens.reader(), arena, build_tree)
+    reader = parser.scanner
+    results = []
+    position = 0
+    for start in starts:
+        if start < position:
+            continue
+        position = start
+        while position < last:
+            reader.index = position
+            parser.current_token = reader.get_next_token()
+            parser.syntax_errors = []
+            parser.unexpected_eof = parser.eof_error_reported = False
+            node = parser.declaration()
+            end = reader.last if parser.current_token.terminal == T_EOF else reader.index - 1
+            if end > last:
+                return results, arena
+            results.append((position, end, node.index if build_tree else None, parser.syntax_errors, parser.unexpected_eof))
+            if parser.unexpected_eof:
+                return results, arena
+            position = end
+            if tokens.terminals[end] != T_INT and tokens.terminals[end] != T_VOID:
+                break
+    return results, arena
+
+
+class ParallelParser(IncrementalParser):
+    """
+    Parser for a whole pre-lexed token stream that parses top-level
+    declarations in up to `jobs` worker processes (default: one per CPU) and
+    merges them in source order. The tree is built in the given arena, or a
+    new ParseTreeArena, since subtrees come back from the workers as arrays.
+    """
+
+    def __init__(
+        self,
+        tokens: TokenBuffer,
+        arena: ParseTreeArena = None,
+        build_tree: bool = True,
+        context: CompilationContext = None,
+        jobs: int = None,
+        min_chunk_tokens: int = MIN_CHUNK_TOKENS,
+    ):
+        if build_tree and arena is None:
+            arena = ParseTreeArena(ARENA_NAMES)
+        super().__init__(context, arena, build_tree)
+        self.tokens = tokens
+        self.jobs = jobs or os.cpu_count() or 1
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def parse(self) -> tuple[ParseNode, list[ParseError]]:
+        """Parse the token stream, in parallel when it is large enough."""
+        tokens = self.tokens
+        starts = declaration_starts(tokens)
+        parts = min(self.jobs, len(tokens) // self.min_chunk_tokens, len(starts))
+        if parts <= 1 or self.context.error_budget.limited:
+            # Too small to split, or syntax errors must be counted against the error budget in order
+            return self._parse_tokens(tokens, {})
+
+        # Split at the guessed declaration starts nearest to equal token counts
+        bounds = [0]
+        for part in range(1, parts):
+            i = bisect_left(starts, len(tokens) * part // parts)
+            if i < len(starts) and starts[i] > bounds[-1]:
+                bounds.append(starts[i])
+        bounds.append(len(tokens))
+
+        chunks = []
+        chunk_starts = []
+        lasts = []
+        for start, stop in zip(bounds, bounds[1:]):
+            # Each part overlaps the next by one token: the lookahead its last declaration stops at
+            chunks.append(_slice(tokens, start, min(stop + 1, len(tokens))))
+            chunk_starts.append([index - start for index in starts[bisect_left(starts, start):bisect_left(starts, stop)]])
+            lasts.append(min(stop, len(tokens) - 1) - start)
+
+        with ProcessPoolExecutor(min(self.jobs, len(chunks))) as executor:
+            results = list(executor.map(_parse_chunk, chunks, chunk_starts, lasts, repeat(self.build_tree)))
+
+        reusable = {}
+        for offset, (declarations, arena) in zip(bounds, results):
+            node_offset = self.arena.extend(arena) if self.build_tree else 0
+            for start, end, root, errors, unexpected_eof in declarations:
+                node = NodeView(self.arena, root + node_offset) if self.build_tree else NULL_NODE
+                reusable[start + offset] = ParsedDeclaration(start + offset, end + offset, node, errors, unexpected_eof)
+        return self._parse_tokens(tokens, reusable)
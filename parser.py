@@ -1,8 +1,26 @@
 # Amir Hossein Ravan Nakhjavani - 400104975
 # Maedeh Heydari - 400104918
 
+from consts import TERMINAL_IDS, TERMINALS
+from context import CompilationContext
+from error import ParseError
+from grammar import load_grammar
 from scanner import Scanner
+from semantic import SemanticActions
 from tokens import Token, TokenType
+from tree_arena import ParseTreeArena
+from tree_writer import tree_to_string, write_tree
+
+T_EOF = TERMINAL_IDS["$"]
+
+
+def terminal_mask(terminals) -> int:
+    """Bitmask of terminal IDs for a set of terminal names (ε is ignored)."""
+    mask = 0
+    for name in terminals:
+        if name in TERMINAL_IDS:
+            mask |= 1 << TERMINAL_IDS[name]
+    return mask
 
 
 class ParseNode:
@@ -17,400 +35,248 @@ class ParseNode:
         if child is not None:
             self.children.append(child)
     
-    def to_string(self, prefix: str = "", is_root: bool = True, is_last: bool = True) -> str:
+    @classmethod
+    def for_token(cls, token: Token) -> "ParseNode":
+        """Terminal node for a matched token, e.g. (ID, x) or (SYMBOL, ;)."""
+        if token.token_type is TokenType.EOF:
+            return cls(token.token_string, is_terminal=True)
+        return cls(f"({token.token_type.value}, {token.token_string})", is_terminal=True)
+    
+    def to_string(self) -> str:
         """Convert parse tree to required string format with tree-drawing characters."""
-        result = ""
-        
-        # For root node (no prefix)
-        if is_root:
-            result = self.name + "\n"
-            # Root's children use ├── for all except last which uses └──
-            for i, child in enumerate(self.children):
-                is_last_child = (i == len(self.children) - 1)
-                result += child.to_string("", False, is_last_child)
-        else:
-            # Use tree-drawing characters
-            connector = "└── " if is_last else "├── "
-            result = prefix + connector + self.name + "\n"
-            
-            # Prepare prefix for children
-            extension = "    " if is_last else "│   "
-            new_prefix = prefix + extension
-            
-            for i, child in enumerate(self.children):
-                is_last_child = (i == len(self.children) - 1)
-                result += child.to_string(new_prefix, False, is_last_child)
-        
-        return result
+        return tree_to_string(self)
+
+
+class _DiscardedChildren:
+    def append(self, child):
+        pass
+
+
+class NullNode:
+    """Shared stand-in for every tree node when the parser only validates."""
+    __slots__ = ()
+    name = ""
+    is_terminal = False
+    children = _DiscardedChildren()
+    
+    def add_child(self, child):
+        pass
+
+
+NULL_NODE = NullNode()
+
+
+def _null_node(*args, **kwargs) -> NullNode:
+    return NULL_NODE
 
 
 class Parser:
     """Predictive Recursive Descent Parser for C-minus."""
     
-    def __init__(self, scanner: Scanner):
+    # Whether the rule methods parse through match() and _predict_or_recover(),
+    # where semantic actions hook in
+    RUNS_ACTIONS = True
+    
+    def __init__(
+        self,
+        scanner: Scanner,
+        arena: ParseTreeArena = None,
+        build_tree: bool = True,
+        context: CompilationContext = None,
+        actions: SemanticActions = None,
+    ):
         self.scanner = scanner
+        # Pass the scanner's context to collect all results of a compilation in one place
+        self.context = context if context is not None else CompilationContext()
         self.current_token = None
-        self.syntax_errors = []
+        self.syntax_errors = self.context.syntax_errors
         self.parse_tree = None
         self.eof_error_reported = False
         self.unexpected_eof = False
         
-        self.first_sets = self._init_first_sets()
-        
-        self.follow_sets = self._init_follow_sets()
-        
-        self.predict_sets = self._init_predict_sets()
-    
-    def _init_first_sets(self):
-        """Initialize First sets"""
-        return {
-            "Program": {"int", "void", "ε"},
-            "Declaration-list": {"int", "void", "ε"},
-            "Declaration": {"int", "void"},
-            "Declaration-initial": {"int", "void"},
-            "Declaration-prime": {"[", "(", ";"},
-            "Var-declaration-prime": {"[", ";"},
-            "Fun-declaration-prime": {"("},
-            "Type-specifier": {"int", "void"},
-            "Params": {"int", "void"},
-            "Param-list": {",", "ε"},
-            "Param": {"int", "void"},
-            "Param-prime": {"[", "ε"},
-            "Compound-stmt": {"{"},
-            "Statement-list": {"ID", "NUM", ";", "(", "{", "break", "if", "for", "return", "+", "-", "ε"},
-            "Statement": {"ID", "NUM", ";", "(", "{", "break", "if", "for", "return", "+", "-"},
-            "Expression-stmt": {"ID", "NUM", ";", "(", "break", "+", "-"},
-            "Selection-stmt": {"if"},
-            "Else-stmt": {"else", "ε"},
-            "Iteration-stmt": {"for"},
-            "Return-stmt": {"return"},
-            "Return-stmt-prime": {"ID", "NUM", ";", "(", "+", "-"},
-            "Expression": {"ID", "NUM", "(", "+", "-"},
-            "B": {"[", "(", "=", "==", "<", "+", "*", "/", "-", "ε"},
-            "H": {"=", "==", "<", "+", "*", "/", "-", "ε"},
-            "Simple-expression-zegond": {"NUM", "(", "+", "-"},
-            "Simple-expression-prime": {"(", "==", "<", "+", "*", "/", "-", "ε"},
-            "C": {"==", "<", "ε"},
-            "Relop": {"==", "<"},
-            "Additive-expression": {"ID", "NUM", "(", "+", "-"},
-            "Additive-expression-prime": {"(", "+", "*", "/", "-", "ε"},
-            "Additive-expression-zegond": {"NUM", "(", "+", "-"},
-            "D": {"+", "-", "ε"},
-            "Addop": {"+", "-"},
-            "Term": {"ID", "NUM", "(", "+", "-"},
-            "Term-prime": {"(", "*", "/", "ε"},
-            "Term-zegond": {"NUM", "(", "+", "-"},
-            "G": {"*", "/", "ε"},
-            "Signed-factor": {"ID", "NUM", "(", "+", "-"},
-            "Signed-factor-zegond": {"NUM", "(", "+", "-"},
-            "Factor": {"ID", "NUM", "("},
-            "Var-call-prime": {"[", "(", "ε"},
-            "Var-prime": {"[", "ε"},
-            "Factor-prime": {"(", "ε"},
-            "Factor-zegond": {"NUM", "("},
-            "Args": {"ID", "NUM", "(", "+", "-", "ε"},
-            "Arg-list": {"ID", "NUM", "(", "+", "-"},
-            "Arg-list-prime": {",", "ε"},
-        }
-    
-    def _init_follow_sets(self):
-        """Initialize Follow sets"""
-        return {
-            "Program": {"$"},
-            "Declaration-list": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "for", "return", "+", "-", "$"},
-            "Declaration": {"ID", "int", "void", "NUM", ";", "(", "{", "}", "break", "if", "for", "return", "+", "-", "$"},
-            "Declaration-initial": {"[", "(", ",", ")", ";"},
-            "Declaration-prime": {"ID", "int", "void", "NUM", ";", "(", "{", "}", "break", "if", "for", "return", "+", "-", "$"},
-            "Var-declaration-prime": {"ID", "int", "void", "NUM", ";", "(", "{", "}", "break", "if", "for", "return", "+", "-", "$"},
-            "Fun-declaration-prime": {"ID", "int", "void", "NUM", ";", "(", "{", "}", "break", "if", "for", "return", "+", "-", "$"},
-            "Type-specifier": {"ID"},
-            "Params": {")"},
-            "Param-list": {")"},
-            "Param": {")", ","},
-            "Param-prime": {")", ","},
-            "Compound-stmt": {"ID", "int", "void", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-", "$"},
-            "Statement-list": {"}"},
-            "Statement": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            "Expression-stmt": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            "Selection-stmt": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            "Else-stmt": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            "Iteration-stmt": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            "Return-stmt": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            "Return-stmt-prime": {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            "Expression": {"]", ";", ")", ","},
-            "B": {"]", ";", ")", ","},
-            "H": {"]", ";", ")", ","},
-            "Simple-expression-zegond": {"]", ";", ")", ","},
-            "Simple-expression-prime": {"]", ";", ")", ","},
-            "C": {"]", ";", ")", ","},
-            "Relop": {"ID", "NUM", "(", "+", "-"},
-            "Additive-expression": {"]", ";", ")", ","},
-            "Additive-expression-prime": {"]", ";", ")", ",", "==", "<"},
-            "Additive-expression-zegond": {"]", ";", ")", ",", "==", "<"},
-            "D": {"]", ";", ")", ",", "==", "<"},
-            "Addop": {"ID", "NUM", "(", "+", "-"},
-            "Term": {"]", ";", ")", ",", "==", "<", "+", "-"},
-            "Term-prime": {"]", ";", ")", ",", "==", "<", "+", "-"},
-            "Term-zegond": {"]", ";", ")", ",", "==", "<", "+", "-"},
-            "G": {"]", ";", ")", ",", "==", "<", "+", "-"},
-            "Signed-factor": {"]", ";", ")", ",", "==", "<", "+", "-", "*", "/"},
-            "Signed-factor-zegond": {"]", ";", ")", ",", "==", "<", "+", "-", "*", "/"},
-            "Factor": {"]", ";", ")", ",", "==", "<", "+", "-", "*", "/"},
-            "Var-call-prime": {"]", ";", ")", ",", "==", "<", "+", "-", "*", "/"},
-            "Var-prime": {"]", ";", ")", ",", "==", "<", "+", "-", "*", "/"},
-            "Factor-prime": {"]", ";", ")", ",", "==", "<", "+", "-", "*", "/"},
-            "Factor-zegond": {"]", ";", ")", ",", "==", "<", "+", "-", "*", "/"},
-            "Args": {")"},
-            "Arg-list": {")"},
-            "Arg-list-prime": {")"},
-        }
-    
-    def _init_predict_sets(self):
-        """Initialize Predict sets for each production"""
-        return {
-            # Program → Declaration-list
-            ("Program", 1): {"int", "void", "$"},
-            
-            # Declaration-list → Declaration Declaration-list
-            ("Declaration-list", 2): {"int", "void"},
-            # Declaration-list → ε
-            ("Declaration-list", 3): {"ID", "NUM", ";", "(", "{", "}", "break", "if", "for", "return", "+", "-", "$"},
-            
-            # Declaration → Declaration-initial Declaration-prime
-            ("Declaration", 4): {"int", "void"},
-            
-            # Declaration-initial → Type-specifier ID
-            ("Declaration-initial", 5): {"int", "void"},
-            
-            # Declaration-prime → Fun-declaration-prime
-            ("Declaration-prime", 6): {"("},
-            # Declaration-prime → Var-declaration-prime
-            ("Declaration-prime", 7): {"[", ";"},
-            
-            # Var-declaration-prime → [ NUM ] ;
-            ("Var-declaration-prime", 8): {"["},
-            # Var-declaration-prime → ;
-            ("Var-declaration-prime", 117): {";"},
-            
-            # Fun-declaration-prime → ( Params ) Compound-stmt
-            ("Fun-declaration-prime", 9): {"("},
-            
-            # Type-specifier → int
-            ("Type-specifier", 10): {"int"},
-            # Type-specifier → void
-            ("Type-specifier", 11): {"void"},
-            
-            # Params → int ID Param-prime Param-list
-            ("Params", 12): {"int"},
-            # Params → void
-            ("Params", 13): {"void"},
-            
-            # Param-list → , Param Param-list
-            ("Param-list", 14): {","},
-            # Param-list → ε
-            ("Param-list", 15): {")"},
-            
-            # Param → Declaration-initial Param-prime
-            ("Param", 16): {"int", "void"},
-            
-            # Param-prime → [ ]
-            ("Param-prime", 17): {"["},
-            # Param-prime → ε
-            ("Param-prime", 18): {")", ","},
-            
-            # Compound-stmt → { Declaration-list Statement-list }
-            ("Compound-stmt", 19): {"{"},
-            
-            # Statement-list → Statement Statement-list
-            ("Statement-list", 20): {"ID", "NUM", ";", "(", "{", "break", "if", "for", "return", "+", "-"},
-            # Statement-list → ε
-            ("Statement-list", 21): {"}"},
-            
-            # Statement → Expression-stmt
-            ("Statement", 22): {"ID", "NUM", ";", "(", "break", "+", "-"},
-            # Statement → Compound-stmt
-            ("Statement", 23): {"{"},
-            # Statement → Selection-stmt
-            ("Statement", 24): {"if"},
-            # Statement → Iteration-stmt
-            ("Statement", 25): {"for"},
-            # Statement → Return-stmt
-            ("Statement", 26): {"return"},
-            
-            # Expression-stmt → Expression ;
-            ("Expression-stmt", 27): {"ID", "NUM", "(", "+", "-"},
-            # Expression-stmt → break ;
-            ("Expression-stmt", 28): {"break"},
-            # Expression-stmt → ;
-            ("Expression-stmt", 29): {";"},
-            
-            # Selection-stmt → if ( Expression ) Statement Else-stmt
-            ("Selection-stmt", 30): {"if"},
-            
-            # Else-stmt → else Statement
-            ("Else-stmt", 31): {"else"},
-            # Else-stmt → ε
-            ("Else-stmt", 32): {"ID", "NUM", ";", "(", "{", "}", "break", "if", "else", "for", "return", "+", "-"},
-            
-            # Iteration-stmt → for ( Expression ; Expression ; Expression ) Compound-stmt
-            ("Iteration-stmt", 33): {"for"},
-            
-            # Return-stmt → return Return-stmt-prime
-            ("Return-stmt", 34): {"return"},
-            
-            # Return-stmt-prime → Expression ;
-            ("Return-stmt-prime", 35): {"ID", "NUM", "(", "+", "-"},
-            # Return-stmt-prime → ;
-            ("Return-stmt-prime", 36): {";"},
-            
-            # Expression → Simple-expression-zegond
-            ("Expression", 37): {"NUM", "(", "+", "-"},
-            # Expression → ID B
-            ("Expression", 38): {"ID"},
-            
-            # B → = Expression
-            ("B", 39): {"="},
-            # B → [ Expression ] H
-            ("B", 40): {"["},
-            # B → Simple-expression-prime
-            ("B", 41): {"]", ";", ")", ",", "(", "==", "<", "+", "*", "/", "-"},
-            
-            # H → = Expression
-            ("H", 42): {"="},
-            # H → G D C
-            ("H", 43): {"]", ";", ")", ",", "==", "<", "+", "*", "/", "-"},
-            
-            # Simple-expression-zegond → Additive-expression-zegond C
-            ("Simple-expression-zegond", 44): {"NUM", "(", "+", "-"},
-            
-            # Simple-expression-prime → Additive-expression-prime C
-            ("Simple-expression-prime", 45): {"]", ";", ")", ",", "(", "==", "<", "+", "*", "/", "-"},
-            
-            # C → Relop Additive-expression
-            ("C", 46): {"==", "<"},
-            # C → ε
-            ("C", 47): {"]", ";", ")", ","},
-            
-            # Relop → ==
-            ("Relop", 48): {"=="},
-            # Relop → <
-            ("Relop", 49): {"<"},
-            
-            # Additive-expression → Term D
-            ("Additive-expression", 50): {"ID", "NUM", "(", "+", "-"},
-            
-            # Additive-expression-prime → Term-prime D
-            ("Additive-expression-prime", 51): {"]", ";", ")", ",", "(", "==", "<", "+", "*", "/", "-"},
-            
-            # Additive-expression-zegond → Term-zegond D
-            ("Additive-expression-zegond", 52): {"NUM", "(", "+", "-"},
-            
-            # D → Addop Term D
-            ("D", 53): {"+", "-"},
-            # D → ε
-            ("D", 54): {"]", ";", ")", ",", "==", "<"},
-            
-            # Addop → +
-            ("Addop", 55): {"+"},
-            # Addop → -
-            ("Addop", 62): {"-"},
-            
-            # Term → Signed-factor G
-            ("Term", 56): {"ID", "NUM", "(", "+", "-"},
-            
-            # Term-prime → Factor-prime G
-            ("Term-prime", 57): {"]", ";", ")", ",", "(", "==", "<", "+", "*", "/", "-"},
-            
-            # Term-zegond → Signed-factor-zegond G
-            ("Term-zegond", 58): {"NUM", "(", "+", "-"},
-            
-            # G → * Signed-factor G
-            ("G", 59): {"*"},
-            # G → / Signed-factor G
-            ("G", 60): {"/"},
-            # G → ε
-            ("G", 61): {"]", ";", ")", ",", "==", "<", "+", "-"},
-            
-            # Signed-factor → + Factor
-            ("Signed-factor", 65): {"+"},
-            # Signed-factor → - Factor
-            ("Signed-factor", 66): {"-"},
-            # Signed-factor → Factor
-            ("Signed-factor", 64): {"ID", "NUM", "("},
-            
-            # Signed-factor-zegond → + Factor
-            ("Signed-factor-zegond", 63): {"+"},
-            # Signed-factor-zegond → - Factor
-            ("Signed-factor-zegond", 62): {"-"},
-            # Signed-factor-zegond → Factor-zegond
-            ("Signed-factor-zegond", 67): {"NUM", "("},
-            
-            # Factor → ( Expression )
-            ("Factor", 68): {"("},
-            # Factor → ID Var-call-prime
-            ("Factor", 69): {"ID"},
-            # Factor → NUM
-            ("Factor", 70): {"NUM"},
-            
-            # Var-call-prime → ( Args )
-            ("Var-call-prime", 71): {"("},
-            # Var-call-prime → Var-prime
-            ("Var-call-prime", 72): {"]", ";", ")", ",", "==", "<", "+", "*", "/", "-", "["},
-            
-            # Var-prime → [ Expression ]
-            ("Var-prime", 73): {"["},
-            # Var-prime → ε
-            ("Var-prime", 74): {"]", ";", ")", ",", "==", "<", "+", "*", "/", "-"},
-            
-            # Factor-prime → ( Args )
-            ("Factor-prime", 75): {"("},
-            # Factor-prime → ε
-            ("Factor-prime", 76): {"]", ";", ")", ",", "==", "<", "+", "*", "/", "-"},
-            
-            # Factor-zegond → ( Expression )
-            ("Factor-zegond", 77): {"("},
-            # Factor-zegond → NUM
-            ("Factor-zegond", 78): {"NUM"},
-            
-            # Args → Arg-list
-            ("Args", 79): {"ID", "NUM", "(", "+", "-"},
-            # Args → ε
-            ("Args", 80): {")"},
-            
-            # Arg-list → Expression Arg-list-prime
-            ("Arg-list", 81): {"ID", "NUM", "(", "+", "-"},
-            
-            # Arg-list-prime → , Expression Arg-list-prime
-            ("Arg-list-prime", 82): {","},
-            # Arg-list-prime → ε
-            ("Arg-list-prime", 83): {")"},
-        }
+        # Tree nodes are ParseNode objects, or views into a ParseTreeArena when given one.
+        # Without build_tree the parse only validates: every node is NULL_NODE.
+        self.arena = arena
+        self.build_tree = build_tree
+        if not build_tree:
+            if arena is not None:
+                raise ValueError("A parse tree arena needs build_tree=True")
+            self.new_node = _null_node
+            self.new_token_node = _null_node
+        elif arena is None:
+            self.new_node = ParseNode
+            self.new_token_node = ParseNode.for_token
+        else:
+            self.new_node = arena.new_node
+            self.new_token_node = arena.new_token_node
+        
+        # FIRST, FOLLOW and predict sets are computed from grammar.txt (and cached)
+        self.grammar = load_grammar()
+        self.first_sets = self.grammar.first_sets
+        self.follow_sets = self.grammar.follow_sets
+        self.predict_sets = self.grammar.predict_sets
+        self.productions = self.grammar.productions
+        
+        # Parse tables are read-only, so parsers over the same grammar share one
+        table_key = (type(self), self.grammar)
+        if table_key not in Parser._parse_tables:
+            first_masks = {nt: terminal_mask(s) for nt, s in self.first_sets.items()}
+            follow_masks = {nt: terminal_mask(s) for nt, s in self.follow_sets.items()}
+            Parser._parse_tables[table_key] = (
+                self._build_parse_table(),
+                first_masks,
+                follow_masks,
+                # Panic mode discards tokens until one of these
+                {nt: first_masks[nt] | follow_masks[nt] for nt in first_masks},
+            )
+        self.parse_table, self.first_masks, self.follow_masks, self.sync_masks = Parser._parse_tables[table_key]
+        
+        # Semantic actions run at grammar positions as the parse reaches them.
+        # Without any, the rule methods run unwrapped.
+        self.actions = actions
+        self.last_token = None
+        if actions is not None:
+            if not self.RUNS_ACTIONS:
+                raise ValueError(f"{type(self).__name__} does not run semantic actions")
+            self._install_actions(actions)
+    
+    _parse_tables = {}
+    
+    # Single-production non-terminals whose rule methods still run panic mode
+    # when the lookahead is not in their predict set. Every other
+    # single-production non-terminal is expanded without looking at the input.
+    PANIC_CHECKED = {"Declaration", "Additive-expression"}
+    
+    # Known LL(1) conflicts and the production chosen for them.
+    # Dangling else: Else-stmt → else Statement wins over Else-stmt → ε,
+    # binding each else to the nearest unmatched if.
+    CONFLICT_RESOLUTIONS = {
+        ("Else-stmt", "else"): 32,
+    }
+    
+    def _build_parse_table(self):
+        """
+        Build the LL(1) parse table from predict sets.
+        Each non-terminal maps to a row indexed by terminal ID holding a prod_num or None.
+        """
+        table = {}
+        for (nt, prod_num), tokens in self.predict_sets.items():
+            row = table.setdefault(nt, [None] * len(TERMINALS))
+            for terminal in tokens:
+                terminal_id = TERMINAL_IDS[terminal]
+                existing = row[terminal_id]
+                if existing is None or existing == prod_num:
+                    row[terminal_id] = prod_num
+                    continue
+                resolved = self.CONFLICT_RESOLUTIONS.get((nt, terminal))
+                if resolved not in (existing, prod_num):
+                    raise ValueError(
+                        f"LL(1) conflict in parse table: {nt} on '{terminal}' "
+                        f"predicts both production {existing} and {prod_num}"
+                    )
+                row[terminal_id] = resolved
+        return table
+    
+    def _install_actions(self, actions: SemanticActions):
+        """
+        Wrap the rule methods, match() and _predict_or_recover() to track the
+        grammar position of the parse and run the actions bound to it.
+        """
+        lengths = {prod_num: len(rhs) for (_, prod_num), rhs in self.productions.items()}
+        for production, positions in actions.bindings.items():
+            for position in positions:
+                if production not in lengths or not 0 <= position <= lengths[production]:
+                    raise ValueError(f"No grammar position {position} in production {production}")
+        
+        # [actions by position, symbols parsed] of each production being parsed, innermost last
+        frames = []
+        bindings = actions.bindings
+        run = actions.run
+        
+        def enter(prod_num):
+            positions = bindings.get(prod_num)
+            frames.append([positions, 0])
+            if positions and 0 in positions:
+                run(positions[0], self.last_token)
+        
+        def passed():
+            # One more symbol of the innermost production is parsed (or skipped in panic mode)
+            if frames and not self.unexpected_eof:
+                frame = frames[-1]
+                frame[1] += 1
+                if frame[0] and frame[1] in frame[0]:
+                    run(frame[0][frame[1]], self.last_token)
+        
+        def rule(method, prod_num):
+            def run_rule():
+                depth = len(frames)
+                if prod_num is not None and not self.unexpected_eof:
+                    enter(prod_num)
+                node = method()
+                del frames[depth:]
+                passed()
+                return node
+            return run_rule
+        
+        # Single-production non-terminals are entered on the call, the others
+        # (and the panic-checked ones) once a production is predicted
+        alternatives = {}
+        for nt, prod_num in self.productions:
+            alternatives.setdefault(nt, []).append(prod_num)
+        for nt, prod_nums in alternatives.items():
+            name = nt.lower().replace("-", "_")
+            single = prod_nums[0] if len(prod_nums) == 1 and nt not in self.PANIC_CHECKED else None
+            setattr(self, name, rule(getattr(self, name), single))
+        
+        predict_or_recover = self._predict_or_recover
+        match = self.match
+        
+        def predict_and_enter(non_terminal):
+            prod_num = predict_or_recover(non_terminal)
+            if prod_num is not None:
+                enter(prod_num)
+            return prod_num
+        
+        def match_and_pass(expected):
+            token = self.current_token
+            node = match(expected)
+            if self.current_token is not token:
+                self.last_token = token
+            passed()
+            return node
+        
+        self._predict_or_recover = predict_and_enter
+        self.match = match_and_pass
     
     def _get_token_string(self, token: Token) -> str:
         """Get token string for matching (keyword/symbol literal or token type)."""
-        if token.token_type == TokenType.KEYWORD:
-            return token.token_string
-        elif token.token_type == TokenType.SYMBOL:
-            return token.token_string
-        elif token.token_type == TokenType.ID:
-            return "ID"
-        elif token.token_type == TokenType.NUMBER:
-            return "NUM"
-        elif token.token_type == TokenType.EOF:
-            return "$"
-        return token.token_string
-    
-    def _get_predict_production(self, non_terminal: str, lookahead: str):
-        """Find which production to use based on predict sets."""
-        for (nt, prod_num), tokens in self.predict_sets.items():
-            if nt == non_terminal and lookahead in tokens:
+        return TERMINALS[token.terminal]
+    
+    def _predict_or_recover(self, non_terminal: str):
+        """
+        Production for the lookahead from the parse table. Without one, panic
+        mode runs and the lookup is retried on the token it stopped at.
+        Returns None when the non-terminal is skipped.
+        """
+        row = self.parse_table[non_terminal]
+        while True:
+            prod_num = row[self.current_token.terminal]
+            if prod_num is not None:
                 return prod_num
-        return None
+            if self._check_first_follow(non_terminal) == 'skip':
+                return None
     
     def _add_error(self, message: str):
-        """Add a syntax error to the error list."""
-        line_num = self.current_token.line_number if self.current_token else 1
-        self.syntax_errors.append(f"#{line_num} : syntax error, {message}")
+        """Add a syntax error at the current token to the error list."""
+        if self.current_token:
+            error = ParseError(self.current_token.line_number, self.current_token.column, message)
+        else:
+            error = ParseError(1, None, message)
+        if self.context.error_budget.allow_syntax_error(str(error)):
+            self.syntax_errors.append(error)
+        else:
+            # Over the error budget: stop parsing as at an unexpected EOF
+            self.unexpected_eof = self.eof_error_reported = True
     
     def _check_first_follow(self, non_terminal: str):
         """
@@ -420,18 +286,18 @@ class Parser:
         if self.unexpected_eof:
             return 'skip'
         
-        lookahead = self._get_token_string(self.current_token)
+        lookahead = self.current_token.terminal
         
         # If lookahead is in FIRST set, proceed normally
-        if lookahead in self.first_sets.get(non_terminal, set()):
+        if self.first_masks[non_terminal] >> lookahead & 1:
             return 'proceed'
         
         # Otherwise, panic mode (no table entry)
-        if lookahead in self.follow_sets.get(non_terminal, set()):
+        if self.follow_masks[non_terminal] >> lookahead & 1:
             # Report missing and pop (don't add to tree)
             self._add_error(f"missing {non_terminal}")
             return 'skip'
-        elif lookahead == "$":
+        elif lookahead == T_EOF:
             # Unexpected EOF - report once and stop parsing
             if not self.eof_error_reported:
                 self._add_error("Unexpected EOF")
@@ -439,44 +305,43 @@ class Parser:
             self.unexpected_eof = True
             return 'skip'
         else:
-            # Report illegal and discard ONE token
-            self._add_error(f"illegal {lookahead}")
-            self.current_token = self.scanner.get_next_token()
-            # After discarding, check if we hit EOF
-            if self._get_token_string(self.current_token) == "$":
-                if not self.eof_error_reported:
-                    self._add_error("Unexpected EOF")
-                    self.eof_error_reported = True
-                self.unexpected_eof = True
-                return 'skip'
-            return 'discard'  # Caller should retry
+            # Report and discard illegal tokens up to one in FIRST ∪ FOLLOW, in a
+            # loop, however many there are
+            sync = self.sync_masks[non_terminal]
+            get_next_token = self.scanner.get_next_token
+            while True:
+                self._add_error(f"illegal {TERMINALS[lookahead]}")
+                if self.unexpected_eof:
+                    return 'skip'
+                self.current_token = get_next_token()
+                lookahead = self.current_token.terminal
+                # After discarding, check if we hit EOF
+                if lookahead == T_EOF:
+                    if not self.eof_error_reported:
+                        self._add_error("Unexpected EOF")
+                        self.eof_error_reported = True
+                    self.unexpected_eof = True
+                    return 'skip'
+                if sync >> lookahead & 1:
+                    return 'discard'  # Caller should retry
     
     def match(self, expected: str) -> ParseNode:
         """Match a terminal symbol."""
         if self.unexpected_eof:
             return None
         
-        token_str = self._get_token_string(self.current_token)
+        terminal = self.current_token.terminal
         
-        if token_str == expected:
+        if terminal == TERMINAL_IDS[expected]:
             # Create terminal node with token format
-            if self.current_token.token_type == TokenType.ID:
-                node = ParseNode(f"(ID, {self.current_token.token_string})", is_terminal=True)
-            elif self.current_token.token_type == TokenType.NUMBER:
-                node = ParseNode(f"(NUM, {self.current_token.token_string})", is_terminal=True)
-            elif self.current_token.token_type == TokenType.KEYWORD:
-                node = ParseNode(f"(KEYWORD, {self.current_token.token_string})", is_terminal=True)
-            elif self.current_token.token_type == TokenType.SYMBOL:
-                node = ParseNode(f"(SYMBOL, {self.current_token.token_string})", is_terminal=True)
-            else:
-                node = ParseNode(f"{self.current_token.token_string}", is_terminal=True)
+            node = self.new_token_node(self.current_token)
             
             # Get next token
             self.current_token = self.scanner.get_next_token()
             return node
         else:
             # Terminal mismatch - Panic Mode
-            if token_str == "$":
+            if terminal == T_EOF:
                 if not self.eof_error_reported:
                     self._add_error("Unexpected EOF")
                     self.eof_error_reported = True
@@ -486,13 +351,15 @@ class Parser:
             # Don't consume token, return None (no node added)
             return None
     
-    def parse(self) -> tuple[ParseNode, list[str]]:
+    def parse(self) -> tuple[ParseNode, list[ParseError]]:
         """Main parsing function."""
         # Get first token
         self.current_token = self.scanner.get_next_token()
         
         # Start parsing from the start symbol
         self.parse_tree = self.program()
+        if not self.build_tree:
+            self.parse_tree = None
         
         # Return parse tree and errors
         return self.parse_tree, self.syntax_errors
@@ -501,11 +368,9 @@ class Parser:
         """Export parse tree to file."""
         with open(filename, "w", encoding="utf-8") as f:
             if self.parse_tree:
-                tree_str = self.parse_tree.to_string()
-                # Remove trailing newline to match expected format
-                if tree_str.endswith("\n"):
-                    tree_str = tree_str[:-1]
-                f.write(tree_str)
+                # Streamed line by line, without a trailing newline to match expected format
+                write_tree(self.parse_tree, f)
+            self._write_truncation_note(f, bool(self.parse_tree))
     
     def export_syntax_errors(self, filename: str):
         """Export syntax errors to file."""
@@ -514,16 +379,23 @@ class Parser:
                 f.write("No syntax errors found.")
             else:
                 for i, error in enumerate(self.syntax_errors):
-                    f.write(error)
+                    f.write(str(error))
                     # Add newline except for the last error
                     if i < len(self.syntax_errors) - 1:
                         f.write("\n")
+            self._write_truncation_note(f, True)
+
+    def _write_truncation_note(self, f, after_text: bool):
+        """End an export file with the error budget's note, if it was exceeded."""
+        note = self.context.error_budget.truncation_note()
+        if note:
+            f.write(f"\n{note}" if after_text else note)
     
     # Grammar rule functions (one for each non-terminal)
     
     def program(self) -> ParseNode:
         """Program → Declaration-list $"""
-        node = ParseNode("Program")
+        node = self.new_node("Program")
         node.add_child(self.declaration_list())
         
         # If unexpected EOF, stop here
@@ -531,23 +403,23 @@ class Parser:
             return node
         
         # Handle any remaining tokens before EOF
-        while self._get_token_string(self.current_token) != "$":
+        while self.current_token.terminal != T_EOF:
             token_str = self._get_token_string(self.current_token)
             self._add_error(f"illegal {token_str}")
+            if self.unexpected_eof:
+                return node
             self.current_token = self.scanner.get_next_token()
         
         # Add EOF token
-        node.add_child(ParseNode("$", is_terminal=True))
+        node.add_child(self.new_node("$", is_terminal=True))
         return node
     
     def declaration_list(self) -> ParseNode:
         """Declaration-list → Declaration Declaration-list | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Declaration-list")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Declaration-list", lookahead)
+        node = self.new_node("Declaration-list")
+        prod_num = self._predict_or_recover("Declaration-list")
         
         if prod_num == 2:  # Declaration Declaration-list
             node.add_child(self.declaration())
@@ -555,16 +427,12 @@ class Parser:
                 return node
             node.add_child(self.declaration_list())
         elif prod_num == 3:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Declaration-list")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.declaration_list()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -572,13 +440,11 @@ class Parser:
         """Declaration → Declaration-initial Declaration-prime"""
         if self.unexpected_eof:
             return None
-        result = self._check_first_follow("Declaration")
-        if result == 'skip':
+        if self._predict_or_recover("Declaration") is None:
+            # Skipped in panic mode
             return None
-        elif result == 'discard':
-            return self.declaration()
         
-        node = ParseNode("Declaration")
+        node = self.new_node("Declaration")
         node.add_child(self.declaration_initial())
         node.add_child(self.declaration_prime())
         return node
@@ -587,7 +453,7 @@ class Parser:
         """Declaration-initial → Type-specifier ID"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Declaration-initial")
+        node = self.new_node("Declaration-initial")
         node.add_child(self.type_specifier())
         node.add_child(self.match("ID"))
         return node
@@ -596,22 +462,16 @@ class Parser:
         """Declaration-prime → Fun-declaration-prime | Var-declaration-prime"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Declaration-prime")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Declaration-prime", lookahead)
+        node = self.new_node("Declaration-prime")
+        prod_num = self._predict_or_recover("Declaration-prime")
         
         if prod_num == 6:  # Fun-declaration-prime
             node.add_child(self.fun_declaration_prime())
         elif prod_num == 7:  # Var-declaration-prime
             node.add_child(self.var_declaration_prime())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Declaration-prime")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.declaration_prime()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -619,25 +479,19 @@ class Parser:
         """Var-declaration-prime → [ NUM ] ; | ;"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Var-declaration-prime")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Var-declaration-prime", lookahead)
+        node = self.new_node("Var-declaration-prime")
+        prod_num = self._predict_or_recover("Var-declaration-prime")
         
         if prod_num == 8:  # [ NUM ] ;
             node.add_child(self.match("["))
             node.add_child(self.match("NUM"))
             node.add_child(self.match("]"))
             node.add_child(self.match(";"))
-        elif prod_num == 117:  # ;
+        elif prod_num == 9:  # ;
             node.add_child(self.match(";"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Var-declaration-prime")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.var_declaration_prime()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -645,7 +499,7 @@ class Parser:
         """Fun-declaration-prime → ( Params ) Compound-stmt"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Fun-declaration-prime")
+        node = self.new_node("Fun-declaration-prime")
         node.add_child(self.match("("))
         node.add_child(self.params())
         node.add_child(self.match(")"))
@@ -656,20 +510,16 @@ class Parser:
         """Type-specifier → int | void"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Type-specifier")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Type-specifier")
+        prod_num = self._predict_or_recover("Type-specifier")
         
-        if lookahead == "int":
+        if prod_num == 11:  # int
             node.add_child(self.match("int"))
-        elif lookahead == "void":
+        elif prod_num == 12:  # void
             node.add_child(self.match("void"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Type-specifier")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.type_specifier()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -677,25 +527,19 @@ class Parser:
         """Params → int ID Param-prime Param-list | void"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Params")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Params")
+        prod_num = self._predict_or_recover("Params")
         
-        prod_num = self._get_predict_production("Params", lookahead)
-        
-        if prod_num == 12:  # int ID Param-prime Param-list
+        if prod_num == 13:  # int ID Param-prime Param-list
             node.add_child(self.match("int"))
             node.add_child(self.match("ID"))
             node.add_child(self.param_prime())
             node.add_child(self.param_list())
-        elif prod_num == 13:  # void
+        elif prod_num == 14:  # void
             node.add_child(self.match("void"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Params")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.params()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -703,26 +547,20 @@ class Parser:
         """Param-list → , Param Param-list | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Param-list")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Param-list")
+        prod_num = self._predict_or_recover("Param-list")
         
-        prod_num = self._get_predict_production("Param-list", lookahead)
-        
-        if prod_num == 14:  # , Param Param-list
+        if prod_num == 15:  # , Param Param-list
             node.add_child(self.match(","))
             node.add_child(self.param())
             node.add_child(self.param_list())
-        elif prod_num == 15:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 16:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Param-list")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.param_list()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -730,7 +568,7 @@ class Parser:
         """Param → Declaration-initial Param-prime"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Param")
+        node = self.new_node("Param")
         node.add_child(self.declaration_initial())
         node.add_child(self.param_prime())
         return node
@@ -739,25 +577,19 @@ class Parser:
         """Param-prime → [ ] | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Param-prime")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Param-prime", lookahead)
+        node = self.new_node("Param-prime")
+        prod_num = self._predict_or_recover("Param-prime")
         
-        if prod_num == 17:  # [ ]
+        if prod_num == 18:  # [ ]
             node.add_child(self.match("["))
             node.add_child(self.match("]"))
-        elif prod_num == 18:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 19:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Param-prime")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.param_prime()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -765,7 +597,7 @@ class Parser:
         """Compound-stmt → { Declaration-list Statement-list }"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Compound-stmt")
+        node = self.new_node("Compound-stmt")
         node.add_child(self.match("{"))
         node.add_child(self.declaration_list())
         node.add_child(self.statement_list())
@@ -776,27 +608,19 @@ class Parser:
         """Statement-list → Statement Statement-list | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Statement-list")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Statement-list", lookahead)
+        node = self.new_node("Statement-list")
+        prod_num = self._predict_or_recover("Statement-list")
         
-        if prod_num == 20:  # Statement Statement-list
+        if prod_num == 21:  # Statement Statement-list
             node.add_child(self.statement())
             node.add_child(self.statement_list())
-        elif prod_num == 21:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 22:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Statement-list")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            elif result == 'discard':
-                return self.statement_list()  # Retry after discarding one token
-            else:  # result == 'proceed' (shouldn't happen in else, but handle it)
-                return self.statement_list()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -804,28 +628,22 @@ class Parser:
         """Statement → Expression-stmt | Compound-stmt | Selection-stmt | Iteration-stmt | Return-stmt"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Statement")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Statement")
+        prod_num = self._predict_or_recover("Statement")
         
-        prod_num = self._get_predict_production("Statement", lookahead)
-        
-        if prod_num == 22:  # Expression-stmt
+        if prod_num == 23:  # Expression-stmt
             node.add_child(self.expression_stmt())
-        elif prod_num == 23:  # Compound-stmt
+        elif prod_num == 24:  # Compound-stmt
             node.add_child(self.compound_stmt())
-        elif prod_num == 24:  # Selection-stmt
+        elif prod_num == 25:  # Selection-stmt
             node.add_child(self.selection_stmt())
-        elif prod_num == 25:  # Iteration-stmt
+        elif prod_num == 26:  # Iteration-stmt
             node.add_child(self.iteration_stmt())
-        elif prod_num == 26:  # Return-stmt
+        elif prod_num == 27:  # Return-stmt
             node.add_child(self.return_stmt())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Statement")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.statement()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -833,26 +651,20 @@ class Parser:
         """Expression-stmt → Expression ; | break ; | ;"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Expression-stmt")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Expression-stmt")
+        prod_num = self._predict_or_recover("Expression-stmt")
         
-        prod_num = self._get_predict_production("Expression-stmt", lookahead)
-        
-        if prod_num == 27:  # Expression ;
+        if prod_num == 28:  # Expression ;
             node.add_child(self.expression())
             node.add_child(self.match(";"))
-        elif prod_num == 28:  # break ;
+        elif prod_num == 29:  # break ;
             node.add_child(self.match("break"))
             node.add_child(self.match(";"))
-        elif prod_num == 29:  # ;
+        elif prod_num == 30:  # ;
             node.add_child(self.match(";"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Expression-stmt")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.expression_stmt()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -860,7 +672,7 @@ class Parser:
         """Selection-stmt → if ( Expression ) Statement Else-stmt"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Selection-stmt")
+        node = self.new_node("Selection-stmt")
         node.add_child(self.match("if"))
         node.add_child(self.match("("))
         node.add_child(self.expression())
@@ -873,25 +685,19 @@ class Parser:
         """Else-stmt → else Statement | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Else-stmt")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Else-stmt")
+        prod_num = self._predict_or_recover("Else-stmt")
         
-        prod_num = self._get_predict_production("Else-stmt", lookahead)
-        
-        if prod_num == 31:  # else Statement
+        if prod_num == 32:  # else Statement
             node.add_child(self.match("else"))
             node.add_child(self.statement())
-        elif prod_num == 32:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 33:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Else-stmt")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.else_stmt()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -899,7 +705,7 @@ class Parser:
         """Iteration-stmt → for ( Expression ; Expression ; Expression ) Compound-stmt"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Iteration-stmt")
+        node = self.new_node("Iteration-stmt")
         node.add_child(self.match("for"))
         node.add_child(self.match("("))
         node.add_child(self.expression())
@@ -915,7 +721,7 @@ class Parser:
         """Return-stmt → return Return-stmt-prime"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Return-stmt")
+        node = self.new_node("Return-stmt")
         node.add_child(self.match("return"))
         node.add_child(self.return_stmt_prime())
         return node
@@ -924,23 +730,17 @@ class Parser:
         """Return-stmt-prime → Expression ; | ;"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Return-stmt-prime")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Return-stmt-prime", lookahead)
+        node = self.new_node("Return-stmt-prime")
+        prod_num = self._predict_or_recover("Return-stmt-prime")
         
-        if prod_num == 35:  # Expression ;
+        if prod_num == 36:  # Expression ;
             node.add_child(self.expression())
             node.add_child(self.match(";"))
-        elif prod_num == 36:  # ;
+        elif prod_num == 37:  # ;
             node.add_child(self.match(";"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Return-stmt-prime")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.return_stmt_prime()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -948,23 +748,17 @@ class Parser:
         """Expression → Simple-expression-zegond | ID B"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Expression")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Expression", lookahead)
+        node = self.new_node("Expression")
+        prod_num = self._predict_or_recover("Expression")
         
-        if prod_num == 37:  # Simple-expression-zegond
+        if prod_num == 38:  # Simple-expression-zegond
             node.add_child(self.simple_expression_zegond())
-        elif prod_num == 38:  # ID B
+        elif prod_num == 39:  # ID B
             node.add_child(self.match("ID"))
             node.add_child(self.b())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Expression")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.expression()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -972,28 +766,22 @@ class Parser:
         """B → = Expression | [ Expression ] H | Simple-expression-prime"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("B")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("B", lookahead)
+        node = self.new_node("B")
+        prod_num = self._predict_or_recover("B")
         
-        if prod_num == 39:  # = Expression
+        if prod_num == 40:  # = Expression
             node.add_child(self.match("="))
             node.add_child(self.expression())
-        elif prod_num == 40:  # [ Expression ] H
+        elif prod_num == 41:  # [ Expression ] H
             node.add_child(self.match("["))
             node.add_child(self.expression())
             node.add_child(self.match("]"))
             node.add_child(self.h())
-        elif prod_num == 41:  # Simple-expression-prime
+        elif prod_num == 42:  # Simple-expression-prime
             node.add_child(self.simple_expression_prime())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("B")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.b()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1001,25 +789,19 @@ class Parser:
         """H → = Expression | G D C"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("H")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("H", lookahead)
+        node = self.new_node("H")
+        prod_num = self._predict_or_recover("H")
         
-        if prod_num == 42:  # = Expression
+        if prod_num == 43:  # = Expression
             node.add_child(self.match("="))
             node.add_child(self.expression())
-        elif prod_num == 43:  # G D C
+        elif prod_num == 44:  # G D C
             node.add_child(self.g())
             node.add_child(self.d())
             node.add_child(self.c())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("H")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.h()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1027,7 +809,7 @@ class Parser:
         """Simple-expression-zegond → Additive-expression-zegond C"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Simple-expression-zegond")
+        node = self.new_node("Simple-expression-zegond")
         node.add_child(self.additive_expression_zegond())
         node.add_child(self.c())
         return node
@@ -1036,7 +818,7 @@ class Parser:
         """Simple-expression-prime → Additive-expression-prime C"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Simple-expression-prime")
+        node = self.new_node("Simple-expression-prime")
         node.add_child(self.additive_expression_prime())
         node.add_child(self.c())
         return node
@@ -1045,25 +827,19 @@ class Parser:
         """C → Relop Additive-expression | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("C")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("C", lookahead)
+        node = self.new_node("C")
+        prod_num = self._predict_or_recover("C")
         
-        if prod_num == 46:  # Relop Additive-expression
+        if prod_num == 47:  # Relop Additive-expression
             node.add_child(self.relop())
             node.add_child(self.additive_expression())
-        elif prod_num == 47:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 48:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("C")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.c()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -1071,20 +847,16 @@ class Parser:
         """Relop → == | <"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Relop")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Relop")
+        prod_num = self._predict_or_recover("Relop")
         
-        if lookahead == "==":
+        if prod_num == 49:  # ==
             node.add_child(self.match("=="))
-        elif lookahead == "<":
+        elif prod_num == 50:  # <
             node.add_child(self.match("<"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Relop")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.relop()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1092,14 +864,11 @@ class Parser:
         """Additive-expression → Term D"""
         if self.unexpected_eof:
             return None
-        result = self._check_first_follow("Additive-expression")
-        if result == 'skip':
-            return None  # Missing non-terminal
-        elif result == 'discard':
-            return self.additive_expression()  # Retry after discarding one token
+        if self._predict_or_recover("Additive-expression") is None:
+            # Skipped in panic mode
+            return None
         
-        # result == 'proceed'
-        node = ParseNode("Additive-expression")
+        node = self.new_node("Additive-expression")
         node.add_child(self.term())
         node.add_child(self.d())
         return node
@@ -1108,7 +877,7 @@ class Parser:
         """Additive-expression-prime → Term-prime D"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Additive-expression-prime")
+        node = self.new_node("Additive-expression-prime")
         node.add_child(self.term_prime())
         node.add_child(self.d())
         return node
@@ -1117,7 +886,7 @@ class Parser:
         """Additive-expression-zegond → Term-zegond D"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Additive-expression-zegond")
+        node = self.new_node("Additive-expression-zegond")
         node.add_child(self.term_zegond())
         node.add_child(self.d())
         return node
@@ -1126,26 +895,20 @@ class Parser:
         """D → Addop Term D | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("D")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("D", lookahead)
+        node = self.new_node("D")
+        prod_num = self._predict_or_recover("D")
         
-        if prod_num == 53:  # Addop Term D
+        if prod_num == 54:  # Addop Term D
             node.add_child(self.addop())
             node.add_child(self.term())
             node.add_child(self.d())
-        elif prod_num == 54:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 55:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("D")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.d()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -1153,20 +916,16 @@ class Parser:
         """Addop → + | -"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Addop")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Addop")
+        prod_num = self._predict_or_recover("Addop")
         
-        if lookahead == "+":
+        if prod_num == 56:  # +
             node.add_child(self.match("+"))
-        elif lookahead == "-":
+        elif prod_num == 57:  # -
             node.add_child(self.match("-"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Addop")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.addop()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1174,7 +933,7 @@ class Parser:
         """Term → Signed-factor G"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Term")
+        node = self.new_node("Term")
         node.add_child(self.signed_factor())
         node.add_child(self.g())
         return node
@@ -1183,7 +942,7 @@ class Parser:
         """Term-prime → Factor-prime G"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Term-prime")
+        node = self.new_node("Term-prime")
         node.add_child(self.factor_prime())
         node.add_child(self.g())
         return node
@@ -1192,7 +951,7 @@ class Parser:
         """Term-zegond → Signed-factor-zegond G"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Term-zegond")
+        node = self.new_node("Term-zegond")
         node.add_child(self.signed_factor_zegond())
         node.add_child(self.g())
         return node
@@ -1201,30 +960,24 @@ class Parser:
         """G → * Signed-factor G | / Signed-factor G | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("G")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("G", lookahead)
+        node = self.new_node("G")
+        prod_num = self._predict_or_recover("G")
         
-        if prod_num == 59:  # * Signed-factor G
+        if prod_num == 61:  # * Signed-factor G
             node.add_child(self.match("*"))
             node.add_child(self.signed_factor())
             node.add_child(self.g())
-        elif prod_num == 60:  # / Signed-factor G
+        elif prod_num == 62:  # / Signed-factor G
             node.add_child(self.match("/"))
             node.add_child(self.signed_factor())
             node.add_child(self.g())
-        elif prod_num == 61:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 63:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("G")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.g()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -1232,26 +985,20 @@ class Parser:
         """Signed-factor → + Factor | - Factor | Factor"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Signed-factor")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Signed-factor")
+        prod_num = self._predict_or_recover("Signed-factor")
         
-        prod_num = self._get_predict_production("Signed-factor", lookahead)
-        
-        if prod_num == 65:  # + Factor
+        if prod_num == 64:  # + Factor
             node.add_child(self.match("+"))
             node.add_child(self.factor())
-        elif prod_num == 66:  # - Factor
+        elif prod_num == 65:  # - Factor
             node.add_child(self.match("-"))
             node.add_child(self.factor())
-        elif prod_num == 64:  # Factor
+        elif prod_num == 66:  # Factor
             node.add_child(self.factor())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Signed-factor")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.signed_factor()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1259,26 +1006,20 @@ class Parser:
         """Signed-factor-zegond → + Factor | - Factor | Factor-zegond"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Signed-factor-zegond")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Signed-factor-zegond")
+        prod_num = self._predict_or_recover("Signed-factor-zegond")
         
-        prod_num = self._get_predict_production("Signed-factor-zegond", lookahead)
-        
-        if prod_num == 63:  # + Factor
+        if prod_num == 67:  # + Factor
             node.add_child(self.match("+"))
             node.add_child(self.factor())
-        elif prod_num == 62:  # - Factor
+        elif prod_num == 68:  # - Factor
             node.add_child(self.match("-"))
             node.add_child(self.factor())
-        elif prod_num == 67:  # Factor-zegond
+        elif prod_num == 69:  # Factor-zegond
             node.add_child(self.factor_zegond())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Signed-factor-zegond")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.signed_factor_zegond()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1286,27 +1027,21 @@ class Parser:
         """Factor → ( Expression ) | ID Var-call-prime | NUM"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Factor")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Factor")
+        prod_num = self._predict_or_recover("Factor")
         
-        prod_num = self._get_predict_production("Factor", lookahead)
-        
-        if prod_num == 68:  # ( Expression )
+        if prod_num == 70:  # ( Expression )
             node.add_child(self.match("("))
             node.add_child(self.expression())
             node.add_child(self.match(")"))
-        elif prod_num == 69:  # ID Var-call-prime
+        elif prod_num == 71:  # ID Var-call-prime
             node.add_child(self.match("ID"))
             node.add_child(self.var_call_prime())
-        elif prod_num == 70:  # NUM
+        elif prod_num == 72:  # NUM
             node.add_child(self.match("NUM"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Factor")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.factor()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1314,24 +1049,18 @@ class Parser:
         """Var-call-prime → ( Args ) | Var-prime"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Var-call-prime")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Var-call-prime")
+        prod_num = self._predict_or_recover("Var-call-prime")
         
-        prod_num = self._get_predict_production("Var-call-prime", lookahead)
-        
-        if prod_num == 71:  # ( Args )
+        if prod_num == 73:  # ( Args )
             node.add_child(self.match("("))
             node.add_child(self.args())
             node.add_child(self.match(")"))
-        elif prod_num == 72:  # Var-prime
+        elif prod_num == 74:  # Var-prime
             node.add_child(self.var_prime())
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Var-call-prime")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.var_call_prime()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1339,26 +1068,20 @@ class Parser:
         """Var-prime → [ Expression ] | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Var-prime")
-        lookahead = self._get_token_string(self.current_token)
+        node = self.new_node("Var-prime")
+        prod_num = self._predict_or_recover("Var-prime")
         
-        prod_num = self._get_predict_production("Var-prime", lookahead)
-        
-        if prod_num == 73:  # [ Expression ]
+        if prod_num == 75:  # [ Expression ]
             node.add_child(self.match("["))
             node.add_child(self.expression())
             node.add_child(self.match("]"))
-        elif prod_num == 74:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 76:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Var-prime")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.var_prime()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -1366,26 +1089,20 @@ class Parser:
         """Factor-prime → ( Args ) | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Factor-prime")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Factor-prime", lookahead)
+        node = self.new_node("Factor-prime")
+        prod_num = self._predict_or_recover("Factor-prime")
         
-        if prod_num == 75:  # ( Args )
+        if prod_num == 77:  # ( Args )
             node.add_child(self.match("("))
             node.add_child(self.args())
             node.add_child(self.match(")"))
-        elif prod_num == 76:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 78:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Factor-prime")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.factor_prime()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -1393,24 +1110,18 @@ class Parser:
         """Factor-zegond → ( Expression ) | NUM"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Factor-zegond")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Factor-zegond", lookahead)
+        node = self.new_node("Factor-zegond")
+        prod_num = self._predict_or_recover("Factor-zegond")
         
-        if prod_num == 77:  # ( Expression )
+        if prod_num == 79:  # ( Expression )
             node.add_child(self.match("("))
             node.add_child(self.expression())
             node.add_child(self.match(")"))
-        elif prod_num == 78:  # NUM
+        elif prod_num == 80:  # NUM
             node.add_child(self.match("NUM"))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Factor-zegond")
-            if result == 'skip':
-                return None
-            else:  # result == 'discard'
-                return self.factor_zegond()
+            # Skipped in panic mode
+            return None
         
         return node
     
@@ -1418,24 +1129,18 @@ class Parser:
         """Args → Arg-list | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Args")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Args", lookahead)
+        node = self.new_node("Args")
+        prod_num = self._predict_or_recover("Args")
         
-        if prod_num == 79:  # Arg-list
+        if prod_num == 81:  # Arg-list
             node.add_child(self.arg_list())
-        elif prod_num == 80:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 82:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Args")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.args()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
     
@@ -1443,7 +1148,7 @@ class Parser:
         """Arg-list → Expression Arg-list-prime"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Arg-list")
+        node = self.new_node("Arg-list")
         node.add_child(self.expression())
         node.add_child(self.arg_list_prime())
         return node
@@ -1452,25 +1157,19 @@ class Parser:
         """Arg-list-prime → , Expression Arg-list-prime | ε"""
         if self.unexpected_eof:
             return None
-        node = ParseNode("Arg-list-prime")
-        lookahead = self._get_token_string(self.current_token)
-        
-        prod_num = self._get_predict_production("Arg-list-prime", lookahead)
+        node = self.new_node("Arg-list-prime")
+        prod_num = self._predict_or_recover("Arg-list-prime")
         
-        if prod_num == 82:  # , Expression Arg-list-prime
+        if prod_num == 84:  # , Expression Arg-list-prime
             node.add_child(self.match(","))
             node.add_child(self.expression())
             node.add_child(self.arg_list_prime())
-        elif prod_num == 83:  # ε
-            node.add_child(ParseNode("epsilon", is_terminal=True))
+        elif prod_num == 85:  # ε
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         else:
-            # No valid production - Panic Mode
-            result = self._check_first_follow("Arg-list-prime")
-            if result == 'skip':
-                if self.unexpected_eof:
-                    return None
-                node.add_child(ParseNode("epsilon", is_terminal=True))
-            else:  # result == 'discard'
-                return self.arg_list_prime()
+            # Skipped in panic mode
+            if self.unexpected_eof:
+                return None
+            node.add_child(self.new_node("epsilon", is_terminal=True))
         
         return node
@@ -0,0 +1,342 @@
+"""Generate a specialized recursive-descent parser module from grammar.txt.
+
+The generated GeneratedParser has one method per non-terminal with the
+lookahead dispatch inlined as terminal ID comparisons or bitmask tests and
+the panic-mode recovery sets embedded as bitmask constants. It produces the same parse
+tree and syntax errors as the hand-written Parser.
+
+Usage: python3 parser_generator.py [-o generated_parser.py]
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import sys
+import types
+
+from consts import TERMINAL_IDS, TERMINALS
+from grammar import load_grammar
+from parser import Parser, terminal_mask
+
+logger = logging.getLogger(__name__)
+
+GENERATOR_VERSION = 8
+GENERATED_MODULE = "generated_parser"
+GENERATED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{GENERATED_MODULE}.py")
+
+# Dispatch on up to this many terminals with '==' chains, larger sets use bitmasks
+MAX_INLINE_COMPARISONS = 2
+
+HEADER = '''\
+# Generated by parser_generator.py from grammar.txt - do not edit.
+
+from consts import TERMINALS
+from error import ParseError
+from parser import ParseNode, Parser
+
+GRAMMAR_KEY = {grammar_key!r}
+GENERATOR_VERSION = {generator_version!r}
+# Terminal IDs the dispatch code below was generated for
+GENERATED_TERMINALS = {terminals!r}
+
+'''
+
+RUNTIME = '''
+
+class GeneratedParser(Parser):
+    """Predictive recursive-descent parser specialized from grammar.txt."""
+
+    # Generated rule methods shift and predict inline, without the hooks actions need
+    RUNS_ACTIONS = False
+
+    def _advance(self):
+        token = self.scanner.get_next_token()
+        self.current_token = token
+        self._la = token.terminal
+
+    def _shift(self) -> ParseNode:
+        node = self.new_token_node(self.current_token)
+        self._advance()
+        return node
+
+    def _mismatch(self, expected: str):
+        # Terminal mismatch - Panic Mode
+        if self._la == {eof}:
+            if not self.eof_error_reported:
+                self._add_error("Unexpected EOF")
+                self.eof_error_reported = True
+            self.unexpected_eof = True
+        else:
+            self._add_error(f"missing {{expected}}")
+
+    def _recover(self, non_terminal: str, first: int, follow: int) -> str:
+        """Panic mode for a non-terminal. Returns 'proceed', 'skip' or 'discard'."""
+        lookahead = self._la
+        if first >> lookahead & 1:
+            return 'proceed'
+        if follow >> lookahead & 1:
+            self._add_error(f"missing {{non_terminal}}")
+            return 'skip'
+        if lookahead == {eof}:
+            if not self.eof_error_reported:
+                self._add_error("Unexpected EOF")
+                self.eof_error_reported = True
+            self.unexpected_eof = True
+            return 'skip'
+        # Discard illegal tokens up to one in FIRST ∪ FOLLOW
+        sync = first | follow
+        while True:
+            self._add_error(f"illegal {{TERMINALS[lookahead]}}")
+            if self.unexpected_eof:
+                return 'skip'
+            self._advance()
+            lookahead = self._la
+            if lookahead == {eof}:
+                if not self.eof_error_reported:
+                    self._add_error("Unexpected EOF")
+                    self.eof_error_reported = True
+                self.unexpected_eof = True
+                return 'skip'
+            if sync >> lookahead & 1:
+                return 'discard'
+
+    def parse(self) -> tuple[ParseNode, list[ParseError]]:
+        """Main parsing function."""
+        self._advance()
+        self.parse_tree = self.{start_method}()
+        if not self.build_tree:
+            self.parse_tree = None
+        return self.parse_tree, self.syntax_errors
+'''
+
+
+def method_name(non_terminal: str) -> str:
+    return non_terminal.lower().replace("-", "_")
+
+
+def constant_name(prefix: str, non_terminal: str) -> str:
+    return f"{prefix}_{non_terminal.upper().replace('-', '_')}"
+
+
+class ParserGenerator:
+    """Emits the source of a GeneratedParser module for a grammar."""
+
+    def __init__(self, grammar=None):
+        self.grammar = grammar or load_grammar()
+        # Reuse the hand-written Parser's parse table (with its conflict resolutions)
+        self.parser = Parser(None)
+        self.non_terminals = set(self.grammar.non_terminals)
+        self.constants = []
+        self.lines = []
+
+    def generate(self) -> str:
+        grammar = self.grammar
+        for nt in grammar.non_terminals:
+            self._emit_method(nt)
+
+        source = HEADER.format(
+            grammar_key=grammar.key, generator_version=GENERATOR_VERSION, terminals=TERMINALS
+        )
+        source += "\n".join(self.constants) + "\n"
+        source += RUNTIME.format(start_method=method_name(grammar.start_symbol), eof=TERMINAL_IDS["$"])
+        source += "\n".join(self.lines) + "\n"
+        return source
+
+    def _alternatives(self, nt: str):
+        """[(prod_num, rhs, terminals predicting it)] in grammar order."""
+        predicted = {}
+        for terminal_id, prod_num in enumerate(self.parser.parse_table[nt]):
+            if prod_num is not None:
+                predicted.setdefault(prod_num, set()).add(TERMINALS[terminal_id])
+        return [
+            (prod_num, rhs, predicted.get(prod_num, set()))
+            for (lhs, prod_num), rhs in self.grammar.productions.items()
+            if lhs == nt
+        ]
+
+    def _mask_constant(self, name: str, terminals) -> str:
+        """Emit a bitmask constant with the terminals it covers as a comment."""
+        names = sorted(t for t in terminals if t in TERMINAL_IDS)
+        self.constants.append(f"{name} = {terminal_mask(names):#x}  # {' '.join(names)}")
+        return name
+
+    def _condition(self, nt: str, prod_num: int, terminals: set) -> str:
+        """Lookahead test for a production, as 'expression:  # comment'."""
+        terminals = sorted(terminals, key=TERMINAL_IDS.get)
+        if len(terminals) <= MAX_INLINE_COMPARISONS:
+            test = " or ".join(f"la == {TERMINAL_IDS[t]}" for t in terminals)
+            return f"{test}:  # {' '.join(terminals)}"
+        name = self._mask_constant(f"_PREDICT_{prod_num}", terminals)
+        return f"{name} >> la & 1:"
+
+    def _emit(self, indent: int, line: str = ""):
+        self.lines.append("    " * indent + line if line else "")
+
+    def _emit_expansion(self, indent: int, nt: str, rhs: tuple, shifted: bool = False):
+        self._emit(indent, f"node = self.new_node({nt!r})")
+        self._emit(indent, "children = node.children")
+        if not rhs:
+            self._emit(indent, 'children.append(self.new_node("epsilon", is_terminal=True))')
+        if shifted:
+            self._emit(indent, f"children.append(self._shift())  # {rhs[0]}")
+            rhs = rhs[1:]
+        for symbol in rhs:
+            if symbol in self.non_terminals:
+                self._emit(indent, f"child = self.{method_name(symbol)}()")
+                self._emit(indent, "if child is not None:")
+                self._emit(indent + 1, "children.append(child)")
+            else:
+                self._emit(indent, "if not self.unexpected_eof:")
+                self._emit(indent + 1, f"if self._la == {TERMINAL_IDS[symbol]}:  # {symbol}")
+                self._emit(indent + 2, "children.append(self._shift())")
+                self._emit(indent + 1, "else:")
+                self._emit(indent + 2, f"self._mismatch({symbol!r})")
+
+    def _emit_method(self, nt: str):
+        alternatives = self._alternatives(nt)
+        first_name = constant_name("FIRST", nt)
+        follow_name = constant_name("FOLLOW", nt)
+        self._mask_constant(first_name, self.grammar.first_sets[nt])
+        self._mask_constant(follow_name, self.grammar.follow_sets[nt])
+
+        rule = " | ".join(" ".join(rhs) or "ε" for _, rhs, _ in alternatives)
+        self._emit(1)
+        self._emit(1, f"def {method_name(nt)}(self) -> ParseNode:")
+        self._emit(2, f'"""{nt} → {rule}"""')
+        self._emit(2, "if self.unexpected_eof:")
+        self._emit(3, "return None")
+
+        if nt == self.grammar.start_symbol:
+            self._emit_start(nt, alternatives[0][1])
+        elif len(alternatives) == 1 and nt not in Parser.PANIC_CHECKED:
+            self._emit_expansion(2, nt, alternatives[0][1])
+            self._emit(2, "return node")
+        elif len(alternatives) == 1:
+            self._emit_checked(nt, alternatives[0])
+        else:
+            self._emit_dispatch(nt, alternatives, first_name, follow_name)
+
+    def _emit_start(self, nt: str, rhs: tuple):
+        self._emit_expansion(2, nt, rhs)
+        self._emit(2, "if self.unexpected_eof:")
+        self._emit(3, "return node")
+        self._emit(2, "# Handle any remaining tokens before EOF")
+        self._emit(2, f"while self._la != {TERMINAL_IDS['$']}:")
+        self._emit(3, 'self._add_error(f"illegal {TERMINALS[self._la]}")')
+        self._emit(3, "if self.unexpected_eof:")
+        self._emit(4, "return node")
+        self._emit(3, "self._advance()")
+        self._emit(2, 'children.append(self.new_node("$", is_terminal=True))')
+        self._emit(2, "return node")
+
+    def _emit_checked(self, nt: str, alternative):
+        prod_num, rhs, terminals = alternative
+        self._emit(2, "while True:")
+        self._emit(3, "la = self._la")
+        self._emit(3, f"if {self._condition(nt, prod_num, terminals)}")
+        self._emit(4, "break")
+        self._emit(3, "# No valid production - Panic Mode")
+        self._emit(3, f"result = self._recover({nt!r}, {constant_name('FIRST', nt)}, {constant_name('FOLLOW', nt)})")
+        self._emit(3, "if result == 'skip':")
+        self._emit(4, "return None")
+        self._emit(3, "if result == 'proceed':")
+        self._emit(4, "break")
+        self._emit_expansion(2, nt, rhs)
+        self._emit(2, "return node")
+
+    def _emit_dispatch(self, nt: str, alternatives, first_name: str, follow_name: str):
+        self._emit(2, "while True:")
+        self._emit(3, "la = self._la")
+        keyword = "if"
+        for prod_num, rhs, terminals in alternatives:
+            if not terminals:
+                continue
+            self._emit(3, f"{keyword} {self._condition(nt, prod_num, terminals)}")
+            # The dispatch already matched a leading terminal predicting only this production
+            shifted = len(terminals) == 1 and rhs[:1] == tuple(terminals)
+            self._emit_expansion(4, nt, rhs, shifted)
+            self._emit(4, "return node")
+            keyword = "elif"
+        self._emit(3, "# No valid production - Panic Mode")
+        self._emit(3, f"result = self._recover({nt!r}, {first_name}, {follow_name})")
+        self._emit(3, "if result == 'skip':")
+        if any(not rhs for _, rhs, _ in alternatives):
+            self._emit(4, "if self.unexpected_eof:")
+            self._emit(5, "return None")
+            self._emit(4, "node = self.new_node({!r})".format(nt))
+            self._emit(4, 'node.children.append(self.new_node("epsilon", is_terminal=True))')
+            self._emit(4, "return node")
+        else:
+            self._emit(4, "return None")
+        self._emit(3, "# 'discard': retry with the next token")
+
+
+def generate_parser_source(grammar=None) -> str:
+    return ParserGenerator(grammar).generate()
+
+
+def write_generated_parser(path: str = GENERATED_FILE, grammar=None, source: str = None) -> str:
+    if source is None:
+        source = generate_parser_source(grammar)
+    # Write to a temporary file and rename, so concurrent runs never import a partial module
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(source)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def _module_from_source(source: str) -> types.ModuleType:
+    """Run generated source as the generated module, without a file."""
+    module = types.ModuleType(GENERATED_MODULE)
+    module.__file__ = GENERATED_FILE
+    exec(compile(source, GENERATED_FILE, "exec"), module.__dict__)
+    sys.modules[GENERATED_MODULE] = module
+    return module
+
+
+def load_generated_parser():
+    """Return the GeneratedParser class, regenerating the module if grammar.txt changed."""
+    grammar = load_grammar()
+    module = sys.modules.get(GENERATED_MODULE)
+    if module is None:
+        try:
+            module = importlib.import_module(GENERATED_MODULE)
+        except ImportError:
+            module = None
+    if (
+        module is None
+        or getattr(module, "GRAMMAR_KEY", None) != grammar.key
+        or getattr(module, "GENERATOR_VERSION", None) != GENERATOR_VERSION
+        or getattr(module, "GENERATED_TERMINALS", None) != TERMINALS
+    ):
+        source = generate_parser_source(grammar)
+        try:
+            write_generated_parser(grammar=grammar, source=source)
+        except OSError as e:
+            # A read-only install: use the module without saving it
+            logger.warning(f"Could not write generated parser {GENERATED_FILE}: {e}")
+            return _module_from_source(source).GeneratedParser
+        importlib.invalidate_caches()
+        if module is None:
+            module = importlib.import_module(GENERATED_MODULE)
+        else:
+            module = importlib.reload(module)
+    return module.GeneratedParser
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate a specialized C-minus parser module")
+    arg_parser.add_argument("-o", "--output", default=GENERATED_FILE, help="output module path")
+    args = arg_parser.parse_args()
+    print(f"Wrote {write_generated_parser(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
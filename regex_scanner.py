@@ -0,0 +1,124 @@
+import re
+
+from consts import KEYWORDS, SYMBOLS, TERMINAL_IDS, WHITESPACE
+from error import LeximError, LeximErrorType
+from scanner import T_EOF, T_ID, T_NUM, Scanner
+from tokens import Token, TokenType
+
+# Characters that may follow a number or identifier: whitespace, symbol starts
+# (comments start with symbol characters too) or the end of input
+_DELIMITER = "(?=[{}]|\\Z)".format(
+    re.escape("".join(sorted(WHITESPACE | {symbol[0] for symbol in SYMBOLS})))
+)
+
+# Leading whitespace, then one alternative per lexical unit, tried in order.
+# Only ASCII numbers and identifiers are matched here; anything the pattern does
+# not cover (errors, unclosed comments, non-ASCII text) goes to Scanner._scan.
+MASTER_PATTERN = re.compile(
+    "(?P<ws>[{}]*)(?:{})?".format(
+        re.escape("".join(sorted(WHITESPACE))),
+        "|".join(
+            [
+                "(?P<num>(?:0|[1-9][0-9]*){})".format(_DELIMITER),
+                "(?P<keyword>(?:{}){})".format("|".join(sorted(KEYWORDS)), _DELIMITER),
+                "(?P<id>[A-Za-z_][A-Za-z0-9_]*{})".format(_DELIMITER),
+                r"(?P<block>/\*.*?\*/)",
+                r"(?P<open>/\*)",
+                r"(?P<line>//[^\n\f]*)",
+                r"(?P<stray>\*/)",
+                "(?P<symbol>{})".format(
+                    "|".join(re.escape(symbol) for symbol in sorted(SYMBOLS, key=len, reverse=True))
+                ),
+            ]
+        ),
+    ),
+    re.DOTALL,
+)
+
+# (token type, terminal ID) of each keyword and symbol lexeme
+_FIXED_TOKENS = {
+    **{keyword: (TokenType.KEYWORD, TERMINAL_IDS[keyword]) for keyword in KEYWORDS},
+    **{symbol: (TokenType.SYMBOL, TERMINAL_IDS[symbol]) for symbol in SYMBOLS},
+}
+
+
+class RegexScanner(Scanner):
+    """
+    Scanner driven by one compiled master regex instead of per-character
+    _peek/_advance calls. Emits the same tokens, lexical errors and positions
+    as Scanner, whose character-level code handles every position
+    the master pattern does not match.
+    """
+
+    def get_next_token(self) -> Token:
+        text = self.text
+        length = self.length
+        match_at = MASTER_PATTERN.match
+        fixed_tokens = _FIXED_TOKENS
+        add_token = self._add_token
+
+        position = self._position
+        cursor = self.cursor
+        while True:
+            if cursor == length:
+                # End of the window: read more of a streamed input, or stop
+                self.cursor = cursor
+                self._mark = None
+                more = self._fill()
+                text, length, cursor = self.text, self.length, self.cursor
+                if not more:
+                    break
+
+            match = match_at(text, cursor)
+            if self.stream is not None and match.end() == length:
+                # The match may go on past the window: slide it and match again
+                self.cursor = cursor
+                self._mark = None
+                self._fill(length - cursor + 1)
+                text, length, cursor = self.text, self.length, self.cursor
+                continue
+
+            kind = match.lastgroup
+            start = match.end("ws")
+
+            if kind == "ws" or kind == "open":
+                cursor = start
+                if cursor == length:
+                    continue
+                # Errors, unclosed comments and non-ASCII input take the character-level path
+                self.cursor = cursor
+                token = self._scan()
+                text, length, cursor = self.text, self.length, self.cursor
+                if token:
+                    return token
+                continue
+
+            cursor = match.end()
+            if kind == "block":
+                if self.comments is not None:
+                    self.comments.append((self.offset + start, self.offset + cursor))
+                continue
+            if kind == "line":
+                continue
+            line_number, column = position(start)
+            if kind == "stray":
+                self.cursor = cursor
+                self._add_error(LeximError(line_number, "*/", LeximErrorType.STRAY_COMMENT, column))
+                text, length, cursor = self.text, self.length, self.cursor
+                continue
+
+            if kind == "id":
+                token = Token(line_number, TokenType.ID, None, T_ID, text, start, cursor, column)
+            elif kind == "num":
+                token = Token(line_number, TokenType.NUMBER, None, T_NUM, text, start, cursor, column)
+            else:
+                lexeme = match.group(kind)
+                token_type, terminal = fixed_tokens[lexeme]
+                token = Token(line_number, token_type, lexeme, terminal, column=column)
+            self.cursor = cursor
+            add_token(token)
+            return token
+
+        self.cursor = cursor
+        line_number, column = position(cursor)
+        return Token(line_number, TokenType.EOF, "$", T_EOF, column=column)
@@ -1,274 +1,445 @@
-from consts import KEYWORDS, SYMBOLS, WHITESPACE
+import io
+import os
+import re
+import sys
+from bisect import bisect_right
+
+from consts import KEYWORDS, SYMBOLS, TERMINAL_IDS, WHITESPACE
 from error import LeximError, LeximErrorType
-from tables import error_table, token_table
+from context import CompilationContext
 from tokens import Token, TokenType
 
+T_EOF = TERMINAL_IDS["$"]
+T_ID = TERMINAL_IDS["ID"]
+T_NUM = TERMINAL_IDS["NUM"]
+
+MAX_KEYWORD_LENGTH = max(len(keyword) for keyword in KEYWORDS)
+
+# Characters read from a streamed input at a time
+CHUNK_SIZE = 1 << 16
+
+# Character classes, as bit flags so a set of classes is one mask
+C_ILLEGAL = 1
+C_SPACE = 2
+C_DIGIT = 4
+C_LETTER = 8
+C_SYMBOL = 16
+
+
+def _build_char_classes() -> bytes:
+    classes = bytearray([C_ILLEGAL]) * 128
+    for char in WHITESPACE:
+        classes[ord(char)] = C_SPACE
+    for char in "0123456789":
+        classes[ord(char)] = C_DIGIT
+    for char in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_":
+        classes[ord(char)] = C_LETTER
+    for symbol in SYMBOLS:
+        classes[ord(symbol[0])] = C_SYMBOL
+    return bytes(classes)
+
+
+# Class of each ASCII character, indexed by code point. C-minus has no
+# non-ASCII letters, digits or symbols: every other character is C_ILLEGAL.
+CHAR_CLASSES = _build_char_classes()
+
+
+def char_class(char: str) -> int:
+    code = ord(char)
+    return CHAR_CLASSES[code] if code < 128 else C_ILLEGAL
+
+
+# Characters of an unclosed block comment kept for its error ("/*" and 9 more)
+UNCLOSED_COMMENT_CAPTURE = 11
+
+# Characters that end a line (each one starts a new line number)
+LINE_BREAK = re.compile("[\n\f]")
+
+
+class Checkpoint:
+    """
+    Scanner state at a line start: source offset, line number and whether a
+    block comment is open there. Scanning can restart at a checkpoint with no
+    comment open, since nothing else carries over from one line to the next.
+    """
+
+    __slots__ = ("offset", "line", "in_comment")
+
+    def __init__(self, offset: int, line: int, in_comment: bool):
+        self.offset = offset
+        self.line = line
+        self.in_comment = in_comment
+
 
 class Scanner:
-    def __init__(self, input_text):
-        self.text = input_text
+    """
+    Lexical analyzer for C-minus.
+    The input is either the whole source text (a str), or a path (os.PathLike) or
+    file object that is read in chunks through a sliding window, so memory stays
+    flat for large inputs. Paths and binary files are decoded as UTF-8 with
+    universal newlines, like open(path, "r", encoding="utf-8").
+    """
+
+    def __init__(self, input_text, context: CompilationContext = None, chunk_size: int = CHUNK_SIZE):
+        # Tokens, lexical errors and symbols are recorded in the context
+        self.context = context if context is not None else CompilationContext()
         self.cursor = 0
-        self.length = len(input_text)
-        self.line_number = 1
+        # Absolute source offset of text[0]
+        self.offset = 0
+        # Absolute offsets at which lines start, from the line the window begins in;
+        # lines_dropped counts the earlier ones pruned as the window slides
+        self.line_starts = [0]
+        self.lines_dropped = 0
+        # (line, start offset, next line's start offset) of the last _position lookup
+        self._line = (1, 0, 0)
+        # Block comments as (start, end) source offsets, recorded only when set to a list
+        self.comments = None
+        self.chunk_size = chunk_size
+        # Window start to keep when sliding, while a lexeme is sliced from it (None: cursor)
+        self._mark = None
+        self._owns_stream = False
+        if isinstance(input_text, str):
+            self.text = input_text
+            self.stream = None
+        else:
+            self.text = ""
+            if isinstance(input_text, os.PathLike):
+                input_text = open(input_text, "r", encoding="utf-8")
+                self._owns_stream = True
+            elif not isinstance(input_text, io.TextIOBase):
+                input_text = io.TextIOWrapper(input_text, encoding="utf-8")
+            self.stream = input_text
+        self.length = len(self.text)
+        self._index_lines(self.text, 0)
+
+    def _index_lines(self, text: str, base: int) -> None:
+        """Record the line starts in text, which begins at source offset base."""
+        self.line_starts.extend(match.end() + base for match in LINE_BREAK.finditer(text))
+
+    @property
+    def line_number(self) -> int:
+        """Line of the cursor (line breaks before it plus one)."""
+        return self.lines_dropped + bisect_right(self.line_starts, self.offset + self.cursor)
+
+    def _position(self, index: int) -> tuple[int, int]:
+        """(line, column) of a window index, both counted from 1."""
+        offset = self.offset + index
+        line, start, end = self._line
+        if not start <= offset < end:
+            line_starts = self.line_starts
+            i = bisect_right(line_starts, offset)
+            start = line_starts[i - 1]
+            end = line_starts[i] if i < len(line_starts) else sys.maxsize
+            line = self.lines_dropped + i
+            self._line = (line, start, end)
+        return line, offset - start + 1
+
+    def checkpoint_before(self, offset: int) -> Checkpoint:
+        """
+        Nearest checkpoint at or before a source offset with no block comment
+        open. Needs a str input scanned at least that far with comments recorded.
+        """
+        comments = self.comments
+        # A comment reaching the end of the input may be unclosed and go on past it
+        end = self.offset + self.length
+        line = bisect_right(self.line_starts, offset)
+        while True:
+            line_start = self.line_starts[line - 1]
+            i = bisect_right(comments, (line_start, line_start)) - 1
+            if i < 0 or comments[i][1] < line_start or comments[i][1] == line_start < end:
+                return Checkpoint(line_start, line, False)
+            # Inside a comment: go back to the line it starts on
+            line = bisect_right(self.line_starts, comments[i][0])
+
+    def _fill(self, needed: int = 1) -> bool:
+        """
+        Slide the window over a streamed input until at least `needed` characters
+        follow the cursor. Returns False if the input ends before that.
+        """
+        if self.stream is None:
+            return False
+        keep = self.cursor if self._mark is None else self._mark
+        chunks = [self.text[keep:]]
+        available = self.length - self.cursor
+        end = self.offset + self.length
+        while available < needed:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                if self._owns_stream:
+                    self.stream.close()
+                self.stream = None
+                break
+            chunks.append(chunk)
+            self._index_lines(chunk, end)
+            self._line = (1, 0, 0)
+            end += len(chunk)
+            available += len(chunk)
+        self.text = "".join(chunks)
+        self.length = len(self.text)
+        self.cursor -= keep
+        if self._mark is not None:
+            self._mark -= keep
+        self.offset += keep
+        # Forget the starts of lines that ended before the window
+        dropped = bisect_right(self.line_starts, self.offset) - 1
+        if dropped > 0:
+            del self.line_starts[:dropped]
+            self.lines_dropped += dropped
+        return available >= needed
 
     def _peek(self, offset: int = 0) -> str:
-        if self.cursor + offset < self.length:
+        if self.cursor + offset < self.length or self._fill(offset + 1):
             return self.text[self.cursor + offset]
         return " "
 
     def _advance(self) -> str:
-        if self.cursor < self.length:
+        if self.cursor < self.length or self._fill():
             ch = self.text[self.cursor]
-            if ch == "\n" or ch == "\f":
-                self.line_number += 1
             self.cursor += 1
             return ch
         return " "
 
     def _is_eof(self) -> bool:
-        return self.cursor >= self.length
+        return self.cursor >= self.length and not self._fill()
 
-    def _add_token(self, token_type: TokenType, token_lexim: str) -> None:
-        token_table.add_token(Token(self.line_number, token_type, token_lexim))
+    def _add_token(self, token: Token) -> None:
+        self.context.token_table.add_token(token)
 
     def _add_error(self, error: LeximError) -> None:
-        error_table.add_error(error)
-
-    def _is_symbol_start(self, char: str) -> bool:
-        return char in {
-            ";",
-            ":",
-            ",",
-            "[",
-            "]",
-            "(",
-            ")",
-            "{",
-            "}",
-            "+",
-            "-",
-            "*",
-            "/",
-            "=",
-            "<",
-        }
-
-    def _is_valid_id_char(self, char: str) -> bool:
-        return char is not None and (char.isalnum() or char == "_")
-
-    def _is_valid_id_start(self, char: str) -> bool:
-        return char is not None and (char.isalpha() or char == "_")
+        self.context.error_table.add_error(error)
+        if self.context.error_budget.exceeded is not None:
+            self._skip_to_eof()
+
+    def _skip_to_eof(self) -> None:
+        """Stop scanning: drop the rest of the input without reading it."""
+        if self.stream is not None:
+            if self._owns_stream:
+                self.stream.close()
+            self.stream = None
+        self._mark = None
+        self.cursor = self.length
+
+    def _skip(self, classes: int) -> None:
+        """Advance the cursor past characters whose class is in the classes mask."""
+        char_classes = CHAR_CLASSES
+        while True:
+            text, cursor, length = self.text, self.cursor, self.length
+            while cursor < length:
+                code = ord(text[cursor])
+                if not (char_classes[code] if code < 128 else C_ILLEGAL) & classes:
+                    self.cursor = cursor
+                    return
+                cursor += 1
+            self.cursor = cursor
+            if not self._fill():
+                return
 
     def get_next_token(self) -> Token:
         while not self._is_eof():
-            char = self._peek()
-            if char is None:
-                break
+            token = self._scan()
+            if token:
+                return token
 
-            # 1. Skip Whitespace
-            if char in WHITESPACE:
-                self._advance()
-                continue
-
-            # 2. Numbers
-            if char.isdigit():
-                token = self._handle_number()
-                if token:
-                    return token
-
-            # 3. IDs and Keywords
-            if self._is_valid_id_start(char):
-                token = self._handle_id()
-                if token:
-                    return token
-
-            # 4. Comments and Symbols
-            # Need to check for comments first because they start with symbol characters
-            if char == "/":
-                next_char = self._peek(1)
-                if next_char == "*":
-                    self._handle_block_comment()
-                    continue  # After comment, look for next token
-                elif next_char == "/":
-                    self._handle_line_comment()
-                    continue
-                else:
-                    token = self._handle_symbol()
-                    if token:
-                        return token
-
-            if char == "*":
-                next_char = self._peek(1)
-                if next_char == "/":
-                    self._add_error(
-                        LeximError(self.line_number, "*/", LeximErrorType.STRAY_COMMENT)
-                    )
-                    self._advance()  # *
-                    self._advance()  # /
-                    continue  # Panic mode: skip and continue
-
-            if self._is_symbol_start(char):
+        # Return EOF token
+        line, column = self._position(self.cursor)
+        return Token(line, TokenType.EOF, "$", T_EOF, column=column)
+
+    def _scan(self) -> Token:
+        """
+        Scan from the cursor up to the next token and return it, or consume one
+        run of whitespace, comment or erroneous lexeme and return None.
+        """
+        self._mark = None
+        char = self._peek()
+        kind = char_class(char)
+
+        # 1. Skip Whitespace
+        if kind == C_SPACE:
+            self._skip(C_SPACE)
+            return None
+
+        # 2. Numbers
+        if kind == C_DIGIT:
+            token = self._handle_number()
+            if token:
+                return token
+
+        # 3. IDs and Keywords
+        if kind == C_LETTER:
+            token = self._handle_id()
+            if token:
+                return token
+
+        # 4. Comments and Symbols
+        # Need to check for comments first because they start with symbol characters
+        if char == "/":
+            next_char = self._peek(1)
+            if next_char == "*":
+                self._handle_block_comment()
+                return None  # After comment, look for next token
+            elif next_char == "/":
+                self._handle_line_comment()
+                return None
+            else:
                 token = self._handle_symbol()
                 if token:
                     return token
 
-            # 5. Illegal Character
-            # Invalid character that can't begin any token
-            # Panic Mode: consume consecutive illegal characters
-            lexeme = ""
-            while (
-                self._peek() is not None
-                and self._peek() not in WHITESPACE
-                and not self._peek().isalnum()
-                and self._peek() != "_"
-                and not self._is_symbol_start(self._peek())
-            ):
-                lexeme += self._advance()
-            if not lexeme:  # Safety: consume at least one char
-                lexeme = self._advance()
-            self._add_error(
-                LeximError(self.line_number, lexeme, LeximErrorType.INVALID_CHAR)
-            )
-            # Loop continues to find next token
-
-        # Return EOF token
-        return Token(self.line_number, TokenType.EOF, "$")
+        if char == "*":
+            next_char = self._peek(1)
+            if next_char == "/":
+                line, column = self._position(self.cursor)
+                self._advance()  # *
+                self._advance()  # /
+                self._add_error(LeximError(line, "*/", LeximErrorType.STRAY_COMMENT, column))
+                return None  # Panic mode: skip and continue
+
+        if kind == C_SYMBOL:
+            token = self._handle_symbol()
+            if token:
+                return token
+
+        # 5. Illegal Character
+        # Invalid character that can't begin any token
+        # Panic Mode: consume consecutive illegal characters
+        column = self._position(self.cursor)[1]
+        self._mark = self.cursor
+        self._skip(C_ILLEGAL)
+        lexeme = self.text[self._mark:self.cursor]
+        if not lexeme:  # Safety: consume at least one char
+            lexeme = self._advance()
+        self._add_error(
+            LeximError(self.line_number, lexeme, LeximErrorType.INVALID_CHAR, column)
+        )
+        return None
 
     def _handle_number(self) -> Token:
-        _ = self.cursor
-        lexeme = ""
+        self._mark = self.cursor
 
         # Consume digits
-        while self._peek() is not None and self._peek().isdigit():
-            lexeme += self._advance()
+        self._skip(C_DIGIT)
 
-        next_char = self._peek()
-        
         # Check if followed by invalid character (not whitespace, not symbol, not EOF)
-        if (next_char is not None 
-            and next_char not in WHITESPACE 
-            and not self._is_symbol_start(next_char)):
+        if not char_class(self._peek()) & (C_SPACE | C_SYMBOL):
             # Panic Mode for Number: consume until delimiter (whitespace or symbol)
-            while (self._peek() is not None 
-                   and self._peek() not in WHITESPACE 
-                   and not self._is_symbol_start(self._peek())):
-                lexeme += self._advance()
+            self._skip(C_ILLEGAL | C_DIGIT | C_LETTER)
+            line, column = self._position(self._mark)
             self._add_error(
-                LeximError(self.line_number, lexeme, LeximErrorType.MALFORMED_NUM)
+                LeximError(line, self.text[self._mark:self.cursor], LeximErrorType.MALFORMED_NUM, column)
             )
             return None  # Error, no valid token
 
         # Validate Number Format
-        if len(lexeme) > 1 and lexeme.startswith("0"):
+        if self.cursor - self._mark > 1 and self.text[self._mark] == "0":
+            line, column = self._position(self._mark)
             self._add_error(
-                LeximError(self.line_number, lexeme, LeximErrorType.MALFORMED_NUM)
+                LeximError(line, self.text[self._mark:self.cursor], LeximErrorType.MALFORMED_NUM, column)
             )
             return None  # Error, no valid token
 
-        token = Token(self.line_number, TokenType.NUMBER, lexeme)
-        self._add_token(TokenType.NUMBER, lexeme)
+        line, column = self._position(self._mark)
+        token = Token(line, TokenType.NUMBER, None, T_NUM, self.text, self._mark, self.cursor, column)
+        self._add_token(token)
         return token
 
     def _handle_id(self) -> Token:
-        lexeme = ""
+        self._mark = self.cursor
 
         # Consume valid ID characters
-        while self._is_valid_id_char(self._peek()):
-            lexeme += self._advance()
+        self._skip(C_LETTER | C_DIGIT)
 
         # Check if immediately followed by illegal characters
         # PANIC MODE: Continue until whitespace or symbol
-        next_char = self._peek()
-        if (
-            next_char is not None
-            and next_char not in WHITESPACE
-            and not self._is_symbol_start(next_char)
-            and not self._is_valid_id_char(next_char)
-        ):
+        if char_class(self._peek()) == C_ILLEGAL:
             # Panic Mode: consume until delimiter (whitespace or symbol)
-            while (
-                self._peek() is not None
-                and self._peek() not in WHITESPACE
-                and not self._is_symbol_start(self._peek())
-            ):
-                lexeme += self._advance()
-            
+            self._skip(C_ILLEGAL | C_DIGIT | C_LETTER)
+
             # Report error with thrown-away characters
+            line, column = self._position(self._mark)
             self._add_error(
-                LeximError(self.line_number, lexeme, LeximErrorType.INVALID_CHAR)
+                LeximError(line, self.text[self._mark:self.cursor], LeximErrorType.INVALID_CHAR, column)
             )
             return None  # Error, no valid token
 
-        # Valid ID or Keyword
+        # Valid ID or Keyword (only identifiers as short as a keyword are sliced out to check)
+        lexeme = self.text[self._mark:self.cursor] if self.cursor - self._mark <= MAX_KEYWORD_LENGTH else None
+        line, column = self._position(self._mark)
         if lexeme in KEYWORDS:
-            token = Token(self.line_number, TokenType.KEYWORD, lexeme)
-            self._add_token(TokenType.KEYWORD, lexeme)
+            token = Token(line, TokenType.KEYWORD, lexeme, TERMINAL_IDS[lexeme], column=column)
+            self._add_token(token)
         else:
-            token = Token(self.line_number, TokenType.ID, lexeme)
-            self._add_token(TokenType.ID, lexeme)
+            token = Token(line, TokenType.ID, None, T_ID, self.text, self._mark, self.cursor, column)
+            self._add_token(token)
         return token
 
     def _handle_symbol(self) -> Token:
         char = self._peek()
         next_char = self._peek(1)
+        line, column = self._position(self.cursor)
 
         # Check for double-char symbols first
-        two_chars = char + (next_char if next_char else "")
-
-        if two_chars == "==":
+        if char == "=" and next_char == "=":
             self._advance()
             self._advance()
-            token = Token(self.line_number, TokenType.SYMBOL, "==")
-            self._add_token(TokenType.SYMBOL, "==")
+            token = Token(line, TokenType.SYMBOL, "==", TERMINAL_IDS["=="], column=column)
+            self._add_token(token)
             return token
 
         # Check for valid single char symbol
         if char in SYMBOLS:
             self._advance()
-            token = Token(self.line_number, TokenType.SYMBOL, char)
-            self._add_token(TokenType.SYMBOL, char)
+            token = Token(line, TokenType.SYMBOL, char, TERMINAL_IDS[char], column=column)
+            self._add_token(token)
             return token
 
         # Invalid symbol character - should not reach here in normal flow
         # This is a safety fallback
-        self._add_error(LeximError(self.line_number, char, LeximErrorType.INVALID_CHAR))
+        self._add_error(LeximError(line, char, LeximErrorType.INVALID_CHAR, column))
         self._advance()
         return None  # Error, no valid token
 
     def _handle_line_comment(self) -> None:
-        # Consume //
-        self._advance()
-        self._advance()
-        while not self._is_eof() and self._peek() != "\n" and self._peek() != "\f":
-            _ = self._advance()
-        # Note: \n or \f will be handled by the main loop
+        # Skip // and the rest of the line in one search per window;
+        # the \n or \f ending it is handled by the main loop
+        self.cursor += 2
+        while True:
+            match = LINE_BREAK.search(self.text, self.cursor)
+            if match:
+                self.cursor = match.start()
+                return
+            self.cursor = self.length
+            if not self._fill():
+                return
 
     def _handle_block_comment(self) -> None:
         # Block comments
         # Format: /* ... */
-        start_line = self.line_number
-        self._advance()
-        self._advance()
-
-        comment_content = "/*"
-
-        while not self._is_eof():
-            char = self._peek()
-            next_char = self._peek(1)
-
-            if char == "*" and next_char == "/":
-                self._advance()
-                self._advance()
+        start_line, start_column = self._position(self.cursor)
+
+        # Opening of the comment, reported if it is never closed. Capture more
+        # than 10 characters so tables.py can detect truncation is needed
+        self._peek(UNCLOSED_COMMENT_CAPTURE - 1)
+        comment_content = self.text[self.cursor:self.cursor + UNCLOSED_COMMENT_CAPTURE]
+        start = self.offset + self.cursor
+
+        self.cursor += 2
+        while True:
+            end = self.text.find("*/", self.cursor)
+            if end != -1:
+                self.cursor = end + 2
+                if self.comments is not None:
+                    self.comments.append((start, self.offset + self.cursor))
                 return  # Comment closed successfully
-
-            # Capture content for error reporting if EOF is hit
-            # Capture more than 10 so tables.py can detect truncation is needed
-            if len(comment_content) <= 10:
-                comment_content += char
-
-            self._advance()
+            # Keep a trailing "*" in the window: it may be closed by the next chunk
+            self.cursor = max(self.cursor, self.length - 1)
+            if self.stream is None:
+                break
+            self._fill(2)
+        self.cursor = self.length
+        if self.comments is not None:
+            self.comments.append((start, self.offset + self.cursor))
 
         # Unclosed comment at EOF
         self._add_error(
-            LeximError(start_line, comment_content, LeximErrorType.UNCLOSED_COMMENT)
+            LeximError(start_line, comment_content, LeximErrorType.UNCLOSED_COMMENT, start_column)
         )
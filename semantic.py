@@ -0,0 +1,44 @@
+"""Syntax-directed semantic actions, run by the parser in its single pass.
+
+An action is bound to a grammar position: a production number (as numbered
+in grammar.txt) and how many symbols of its right-hand side have been parsed,
+from 0 (just after the production is predicted) to the length of the
+right-hand side (after its last symbol). The recursive-descent Parser runs
+the actions of each position as it reaches it, in source order, and they
+pass values to one another on a shared semantic stack instead of through
+the parse tree, which can then be left unbuilt (build_tree=False).
+"""
+
+from tokens import Token
+
+
+class SemanticStack(list):
+    """The stack semantic actions push their results to and pop their operands from."""
+
+    push = list.append
+
+    def top(self, depth: int = 0):
+        """The entry depth places below the top."""
+        return self[-1 - depth]
+
+
+class SemanticActions:
+    """
+    Actions by grammar position, each called as action(stack, token) with the
+    semantic stack and the last token matched so far (None before the first).
+    """
+
+    def __init__(self, stack: SemanticStack = None):
+        self.stack = stack if stack is not None else SemanticStack()
+        # Production number -> position -> actions, in the order they were bound
+        self.bindings = {}
+
+    def bind(self, production: int, position: int, action) -> None:
+        """Run action when `position` symbols of the production have been parsed."""
+        self.bindings.setdefault(production, {}).setdefault(position, []).append(action)
+
+    def run(self, actions: list, token: Token) -> None:
+        """Call actions bound to one position."""
+        stack = self.stack
+        for action in actions:
+            action(stack, token)
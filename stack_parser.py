@@ -0,0 +1,145 @@
+from consts import TERMINAL_IDS, TERMINALS
+from context import CompilationContext
+from error import ParseError
+from parser import T_EOF, ParseNode, Parser
+from scanner import Scanner
+from tree_arena import ParseTreeArena
+
+
+class StackParser(Parser):
+    """Table-driven LL(1) parser for C-minus using an explicit symbol stack.
+
+    Drives the same grammar, parse table and panic-mode recovery as the
+    recursive-descent Parser and produces the same parse tree and syntax
+    errors, but never recurses, so parse depth is bounded only by memory.
+    """
+
+    _rules = {}
+
+    def __init__(
+        self,
+        scanner: Scanner,
+        arena: ParseTreeArena = None,
+        build_tree: bool = True,
+        context: CompilationContext = None,
+    ):
+        super().__init__(scanner, arena, build_tree, context)
+        rules_key = (type(self), self.grammar)
+        if rules_key not in StackParser._rules:
+            StackParser._rules[rules_key] = self._build_rules()
+        self.rules = StackParser._rules[rules_key]
+
+    def _stack_symbols(self, rhs: tuple) -> tuple:
+        """Reverse a right-hand side for pushing, with terminals as terminal IDs."""
+        return tuple(
+            symbol if symbol in self.parse_table else TERMINAL_IDS[symbol]
+            for symbol in reversed(rhs)
+        )
+
+    def _build_rules(self):
+        """
+        Build per non-terminal expansion rules from the parse table.
+        Each rule is (row, fixed, fallback, epsilon_on_skip):
+          row: reversed right-hand side (or None) indexed by lookahead terminal ID
+          fixed: reversed right-hand side expanded regardless of lookahead, or None
+          fallback: reversed right-hand side used when panic mode returns 'proceed'
+          epsilon_on_skip: whether a skipped non-terminal still gets an epsilon child
+        Right-hand sides are stored reversed, ready to be pushed on the stack.
+        Non-terminals are pushed by name and terminals by terminal ID.
+        """
+        alternatives = {}
+        for (nt, prod_num), rhs in self.productions.items():
+            alternatives.setdefault(nt, []).append(self._stack_symbols(rhs))
+
+        rules = {}
+        for nt, row in self.parse_table.items():
+            rhs_row = [
+                self._stack_symbols(self.productions[(nt, prod_num)]) if prod_num is not None else None
+                for prod_num in row
+            ]
+            single = alternatives[nt][0] if len(alternatives[nt]) == 1 else None
+            fixed = single if nt not in self.PANIC_CHECKED else None
+            epsilon_on_skip = () in alternatives[nt]
+            rules[nt] = (rhs_row, fixed, single, epsilon_on_skip)
+        return rules
+
+    def parse(self) -> tuple[ParseNode, list[ParseError]]:
+        """Main parsing function."""
+        get_next_token = self.scanner.get_next_token
+        rules = self.rules
+        new_node = self.new_node
+        new_token_node = self.new_token_node
+
+        self.current_token = get_next_token()
+        lookahead = self.current_token.terminal
+
+        root = new_node("Program")
+        self.parse_tree = root
+
+        # Parallel stacks of grammar symbols and the tree node they attach to
+        symbols = [T_EOF, "Declaration-list"]
+        parents = [root, root]
+
+        while symbols:
+            symbol = symbols.pop()
+            parent = parents.pop()
+
+            rule = rules.get(symbol)
+            if rule is None:
+                # Terminal
+                if symbol == T_EOF:
+                    # Program → Declaration-list $: drop anything left before EOF
+                    while lookahead != T_EOF:
+                        self._add_error(f"illegal {TERMINALS[lookahead]}")
+                        if self.unexpected_eof:
+                            break
+                        self.current_token = get_next_token()
+                        lookahead = self.current_token.terminal
+                    if self.unexpected_eof:
+                        break
+                    parent.children.append(new_node("$", is_terminal=True))
+                elif lookahead == symbol:
+                    parent.children.append(new_token_node(self.current_token))
+                    self.current_token = get_next_token()
+                    lookahead = self.current_token.terminal
+                else:
+                    # Terminal mismatch - Panic Mode (reports and sets EOF state)
+                    self.match(TERMINALS[symbol])
+                    if self.unexpected_eof:
+                        break
+                continue
+
+            # Non-terminal
+            row, fixed, fallback, epsilon_on_skip = rule
+            rhs = fixed if fixed is not None else row[lookahead]
+            while rhs is None:
+                # No valid production - Panic Mode
+                result = self._check_first_follow(symbol)
+                lookahead = self.current_token.terminal
+                if result == 'skip':
+                    break
+                if result == 'proceed' and fallback is not None:
+                    rhs = fallback
+                else:  # result == 'discard'
+                    rhs = row[lookahead]
+
+            if rhs is None:
+                if self.unexpected_eof:
+                    break
+                if epsilon_on_skip:
+                    node = new_node(symbol)
+                    node.children.append(new_node("epsilon", is_terminal=True))
+                    parent.children.append(node)
+                continue
+
+            node = new_node(symbol)
+            parent.children.append(node)
+            if not rhs:
+                node.children.append(new_node("epsilon", is_terminal=True))
+            else:
+                symbols.extend(rhs)
+                parents.extend((node,) * len(rhs))
+
+        if not self.build_tree:
+            self.parse_tree = None
+        return self.parse_tree, self.syntax_errors
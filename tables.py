@@ -1,21 +1,41 @@
 import logging
+from itertools import islice
 
-from consts import KEYWORDS
-from error import LeximError, LeximErrorType
-from tokens import Token, TokenType
+from consts import KEYWORDS, TERMINAL_IDS, TERMINALS
+from error import ErrorBudget, LeximError, LeximErrorType
+from tokens import TOKEN_TYPES, Token
+
+T_ID = TERMINAL_IDS["ID"]
+T_NUM = TERMINAL_IDS["NUM"]
 
 logger = logging.getLogger(__name__)
 
+# Write buffer for table exports
+EXPORT_BUFFER_SIZE = 1 << 20
+
 
 class SymbolTable:
     def __init__(self) -> None:
-        self.symbols = []
-        for keyword in KEYWORDS:
-            self.symbols.append(keyword)
+        # Insertion-ordered set of all symbols, keywords first
+        self.symbols = dict.fromkeys(KEYWORDS)
+        self.keywords = sorted(KEYWORDS)
+        # Symbols in export order, sorted on demand and dropped on any change
+        self._sorted = None
 
     def add_symbol(self, symbol: str) -> None:
         if symbol not in self.symbols:
-            self.symbols.append(symbol)
+            self.symbols[symbol] = None
+            self._sorted = None
+
+    def remove_symbol(self, symbol: str) -> None:
+        if symbol in self.symbols and symbol not in KEYWORDS:
+            del self.symbols[symbol]
+            self._sorted = None
+
+    def clear(self) -> None:
+        """Remove all IDs, keeping the keywords."""
+        self.symbols = dict.fromkeys(KEYWORDS)
+        self._sorted = None
 
     def __contains__(self, symbol: str) -> bool:
         return symbol in self.symbols
@@ -24,17 +44,24 @@ class SymbolTable:
         return "\n".join(self.symbols)
 
     def get_symbols(self) -> list[str]:
-        return self.symbols
-
-    def export_to_file(self, filename: str) -> bool:
+        return list(self.symbols)
+
+    def sorted_symbols(self) -> list[str]:
+        """Keywords sorted case-sensitively, then IDs sorted case-insensitively."""
+        if self._sorted is None:
+            # Keywords come first in the dict and are never removed. The sort is
+            # stable, so IDs equal but for case keep their insertion order.
+            ids = sorted(islice(self.symbols, len(KEYWORDS), None), key=str.lower)
+            self._sorted = self.keywords + ids
+        return self._sorted
+
+    def export_to_file(self, filename: str, note: str = None) -> bool:
         try:
             with open(filename, "w", encoding="utf-8") as f:
-                index = 1
-                keywords = sorted([s for s in self.symbols if s in KEYWORDS])
-                ids = sorted([s for s in self.symbols if s not in KEYWORDS], key=str.lower)
-                for symbol in keywords + ids:
+                for index, symbol in enumerate(self.sorted_symbols(), start=1):
                     f.write(f"{index}.\t{symbol}\n")
-                    index += 1
+                if note:
+                    f.write(f"{note}\n")
             return True
         except Exception as e:
             logger.error(f"Error exporting symbol table to file: {e}")
@@ -42,27 +69,92 @@ class SymbolTable:
 
 
 class TokenTable:
-    def __init__(self) -> None:
+    def __init__(self, symbol_table: SymbolTable, record: bool = True) -> None:
+        # {line number: [terminal ID, ...]}, with the index of its lexeme in
+        # self.lexemes after each ID and NUM; formatted on export
         self.tokens = {}
+        # Distinct ID and NUM lexemes, each stored once
+        self.lexemes = []
+        self._lexeme_ids = {}
+        # IDs are also recorded in the symbol table, even when tokens are not recorded
+        self.symbol_table = symbol_table
+        self.record = record
+
+    def _lexeme_id(self, lexeme: str) -> int:
+        lexeme_id = self._lexeme_ids.get(lexeme)
+        if lexeme_id is None:
+            lexeme_id = len(self.lexemes)
+            self.lexemes.append(lexeme)
+            self._lexeme_ids[lexeme] = lexeme_id
+        return lexeme_id
+
+    def _record(self, token: Token, lexeme: str) -> None:
+        line_tokens = self.tokens.get(token.line_number)
+        if line_tokens is None:
+            line_tokens = self.tokens[token.line_number] = []
+        line_tokens.append(token.terminal)
+        if lexeme is not None:
+            line_tokens.append(self._lexeme_id(lexeme))
+
+    @staticmethod
+    def _lexeme(token: Token) -> str:
+        """Lexeme of an ID or NUM token, else None, without caching it in a lazy token."""
+        if token.terminal != T_ID and token.terminal != T_NUM:
+            return None
+        lexeme = token._token_string
+        return lexeme if lexeme is not None else token.source[token.start:token.end]
 
     def add_token(self, token: Token) -> None:
-        if token.line_number not in self.tokens:
-            self.tokens[token.line_number] = []
-        self.tokens[token.line_number].append(
-            f"({token.token_type.value}, {token.token_string})"
-        )
+        lexeme = self._lexeme(token)
+        if self.record:
+            self._record(token, lexeme)
 
         # Add to symbol table if ID
-        if token.token_type == TokenType.ID:
-            if token.token_string not in symbol_table:
-                symbol_table.add_symbol(token.token_string)
+        if token.terminal == T_ID:
+            self.symbol_table.add_symbol(lexeme)
+
+    def splice(self, first: int, last: int, line_delta: int, tokens) -> None:
+        """
+        Replace the tokens of lines first to last with tokens (already numbered
+        for after the edit) and move later lines by line_delta. Unlike
+        add_token, this leaves the symbol table alone.
+        """
+        if not self.record:
+            return
+        if line_delta == 0:
+            for line in range(first, last + 1):
+                self.tokens.pop(line, None)
+        else:
+            self.tokens = {
+                line + line_delta if line > last else line: line_tokens
+                for line, line_tokens in self.tokens.items()
+                if line < first or line > last
+            }
+        for token in tokens:
+            self._record(token, self._lexeme(token))
+
+    def formatted_lines(self):
+        """Yield the lines of tokens.txt (without newlines) in line number order."""
+        lexemes = self.lexemes
+        for lineno in sorted(self.tokens):
+            formatted = []
+            line_tokens = iter(self.tokens[lineno])
+            for terminal in line_tokens:
+                if terminal == T_ID or terminal == T_NUM:
+                    lexeme = lexemes[next(line_tokens)]
+                else:
+                    lexeme = TERMINALS[terminal]
+                formatted.append(f"({TOKEN_TYPES[terminal].value}, {lexeme})")
+            yield f"{lineno}.\t{' '.join(formatted)} "
 
-    def export_to_file(self, filename: str) -> bool:
+    def export_to_file(self, filename: str, note: str = None) -> bool:
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                for lineno in sorted(self.tokens.keys()):
-                    line_tokens = " ".join(self.tokens.get(lineno, []))
-                    f.write(f"{lineno}.\t{line_tokens} \n")
+            with open(filename, "w", encoding="utf-8", buffering=EXPORT_BUFFER_SIZE) as f:
+                for line in self.formatted_lines():
+                    f.write(line)
+                    f.write("\n")
+                if note:
+                    f.write(f"{note}\n")
             return True
         except Exception as e:
             logger.error(f"Error exporting token table to file: {e}")
@@ -70,10 +162,22 @@ class TokenTable:
 
 
 class ErrorTable:
-    def __init__(self) -> None:
+    def __init__(self, budget: ErrorBudget = None) -> None:
         self.errors = []
+        # Errors past the budget are dropped
+        self.budget = budget
 
     def add_error(self, error: LeximError) -> None:
+        text = self._format(error)
+        if self.budget is None or self.budget.allow_lexical_error(text):
+            self.errors.append(text)
+
+    def splice(self, start: int, stop: int, errors) -> None:
+        """Replace errors[start:stop] with errors (LeximError objects)."""
+        self.errors[start:stop] = [self._format(error) for error in errors]
+
+    @staticmethod
+    def _format(error: LeximError) -> str:
         # Truncate unclosed comment error specifically
         # T07 test expects 9 characters before "..."
         if error.error_type == LeximErrorType.UNCLOSED_COMMENT:
@@ -83,7 +187,7 @@ class ErrorTable:
                 lexeme = error.lexeme
         else:
             lexeme = error.lexeme
-        self.errors.append(f"{error.line}.\t({lexeme}, {error.message})")
+        return f"{error.line}.\t({lexeme}, {error.message})"
 
     def is_empty(self) -> bool:
         return len(self.errors) == 0
@@ -91,21 +195,19 @@ class ErrorTable:
     def get_errors(self) -> list[str]:
         return self.errors
 
-    def export_to_file(self, filename: str) -> bool:
+    def export_to_file(self, filename: str, note: str = None) -> bool:
         try:
             # 2. Write lexical_errors.txt
             with open(filename, "w", encoding="utf-8") as f:
-                if error_table.is_empty():
+                if self.is_empty():
                     f.write("No lexical errors found.\n")
                 else:
                     for error in self.errors:
                         f.write(f"{error}\n")
+                if note:
+                    f.write(f"{note}\n")
             return True
         except Exception as e:
             logger.error(f"Error exporting error table to file: {e}")
             return False
 
-
-symbol_table = SymbolTable()
-token_table = TokenTable()
-error_table = ErrorTable()
@@ -1,41 +1,82 @@
 #!/usr/bin/env python3
-"""Test runner for scanner tests."""
+"""Test runner for the scanner and parser tests, run with every engine."""
 
+import io
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from consts import KEYWORDS
+from context import CompilationContext
+from error import ErrorBudget
+from grammar import load_grammar
+from incremental_lexer import IncrementalLexer
+from incremental_parser import IncrementalParser
+from parallel_lexer import lex_parallel
+from parallel_parser import ParallelParser
+from parser import ParseNode, Parser
+from parser_generator import load_generated_parser
+from regex_scanner import RegexScanner
 from scanner import Scanner
-from tables import error_table, symbol_table, token_table
+from semantic import SemanticActions
+from stack_parser import StackParser
+from token_buffer import TokenBuffer
+from tokens import TokenType
+from tree_arena import ParseTreeArena
+from tree_writer import write_tree
 
+TEST_BASE = Path(__file__).parent / "test"
 
-def run_test(test_dir):
-    """Run a single test case."""
+# Panic mode stress test: illegal tokens in a row, and seconds allowed per engine
+PANIC_TOKENS = 1_000_000
+PANIC_TIME_LIMIT = 30.0
+
+
+def scan_with(scanner_class):
+    """Phase 1 lexer scanning the input file as a stream."""
+
+    def lex(input_file, context):
+        with open(input_file, "r", encoding="utf-8") as f:
+            scanner = scanner_class(f, context)
+            while scanner.get_next_token().token_type != TokenType.EOF:
+                pass
+
+    return lex
+
+
+def lex_in_workers(input_file, context):
+    # A chunk size of 1 splits even the small test inputs between the workers
+    lex_parallel(input_file.read_text(encoding="utf-8"), context, jobs=2, min_chunk_size=1)
+
+
+def lex_incrementally(input_file, context):
+    # Delete the first half of the source and type it back in
+    text = input_file.read_text(encoding="utf-8")
+    lexer = IncrementalLexer(text, context)
+    half = len(text) // 2
+    lexer.edit(0, half, "")
+    lexer.edit(0, 0, text[:half])
+
+
+def run_test(test_dir, lex=scan_with(Scanner)):
+    """Run a single scanner test case."""
     input_file = test_dir / "input.txt"
     expected_tokens = test_dir / "tokens.txt"
     expected_errors = test_dir / "lexical_errors.txt"
     expected_symbols = test_dir / "symbol_table.txt"
 
-    token_table.tokens = {}
-    error_table.errors = []
-    symbol_table.symbols = []
-    for keyword in KEYWORDS:
-        symbol_table.symbols.append(keyword)
-
-    # Read input
-    with open(input_file, "r", encoding="utf-8") as f:
-        content = f.read()
+    # Each test gets its own tables, so tests can run concurrently
+    context = CompilationContext()
+    token_table = context.token_table
+    error_table = context.error_table
+    symbol_table = context.symbol_table
 
     # Run scanner
-    scanner = Scanner(content)
-    while scanner.get_next_token():
-        pass
+    lex(input_file, context)
 
     # Generate output strings
-    actual_tokens = []
-    for lineno in sorted(token_table.tokens.keys()):
-        line_tokens = " ".join(token_table.tokens[lineno])
-        actual_tokens.append(f"{lineno}.\t{line_tokens} ")
+    actual_tokens = list(token_table.formatted_lines())
 
     actual_errors = []
     if not error_table.errors:
@@ -81,72 +122,296 @@ def run_test(test_dir):
     )
 
 
-def main():
-    test_base = Path(__file__).parent / "test" / "phase1-tests"
+def report_scanner_test(test_name, result) -> bool:
+    """Print the outcome of a scanner test; returns whether it passed."""
+    (
+        tokens_match,
+        errors_match,
+        symbols_match,
+        actual_tokens,
+        actual_errors,
+        actual_symbols,
+        expected_tokens_lines,
+        expected_errors_lines,
+        expected_symbols_lines,
+    ) = result
 
-    all_passed = True
+    if tokens_match and errors_match and symbols_match:
+        print(f"✅ {test_name}: PASSED")
+        return True
+    print(f"❌ {test_name}: FAILED")
+
+    if not tokens_match:
+        print("  Tokens mismatch:")
+        print(f"    Expected ({len(expected_tokens_lines)} lines):")
+        for line in expected_tokens_lines[:5]:
+            print(f"      {line}")
+        if len(expected_tokens_lines) > 5:
+            print(f"      ... ({len(expected_tokens_lines) - 5} more lines)")
+        print(f"    Actual ({len(actual_tokens)} lines):")
+        for line in actual_tokens[:5]:
+            print(f"      {line}")
+        if len(actual_tokens) > 5:
+            print(f"      ... ({len(actual_tokens) - 5} more lines)")
+
+    if not errors_match:
+        print("  Errors mismatch:")
+        print("    Expected:")
+        for line in expected_errors_lines:
+            print(f"      {line}")
+        print("    Actual:")
+        for line in actual_errors:
+            print(f"      {line}")
+
+    if not symbols_match:
+        print("  Symbol table mismatch:")
+        print("    Expected:")
+        for line in expected_symbols_lines[:10]:
+            print(f"      {line}")
+        if len(expected_symbols_lines) > 10:
+            print(f"      ... ({len(expected_symbols_lines) - 10} more lines)")
+        print("    Actual:")
+        for line in actual_symbols[:10]:
+            print(f"      {line}")
+        if len(actual_symbols) > 10:
+            print(f"      ... ({len(actual_symbols) - 10} more lines)")
+    return False
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f.readlines()]
+
+
+def syntax_error_lines(errors) -> list[str]:
+    """Lines of syntax_errors.txt."""
+    return [str(error) for error in errors] or ["No syntax errors found."]
+
+
+def parse_with(parser_class, scanner_class=Scanner, arena=False):
+    """Phase 2 parse of the input file streamed through a scanner."""
+
+    def parse(input_file):
+        context = CompilationContext()
+        with open(input_file, "r", encoding="utf-8") as f:
+            parser = parser_class(
+                scanner_class(f, context), ParseTreeArena() if arena else None, context=context
+            )
+            return parser.parse()
+
+    return parse
+
+
+def parse_prelexed(input_file):
+    context = CompilationContext()
+    with open(input_file, "r", encoding="utf-8") as f:
+        tokens = TokenBuffer.lex(f, context)
+    return Parser(tokens.reader(), context=context).parse()
+
+
+def parse_incrementally(input_file):
+    # Parse, then reparse after deleting the first half of the source and typing it back in
+    text = input_file.read_text(encoding="utf-8")
+    lexer = IncrementalLexer(text)
+    parser = IncrementalParser()
+    parser.reparse(lexer.get_tokens())
+    half = len(text) // 2
+    parser.reparse(lexer.edit(0, half, ""))
+    return parser.reparse(lexer.edit(0, 0, text[:half]))
+
+
+def parse_in_workers(input_file):
+    context = CompilationContext()
+    with open(input_file, "r", encoding="utf-8") as f:
+        tokens = TokenBuffer.lex(f, context)
+    # A chunk size of 1 splits even the small test inputs between the workers
+    return ParallelParser(tokens, context=context, jobs=2, min_chunk_tokens=1).parse()
+
+
+def tree_building_actions() -> SemanticActions:
+    """Semantic actions that build the parse tree on the semantic stack."""
+    actions = SemanticActions()
+    grammar = load_grammar()
+    non_terminals = set(grammar.non_terminals)
+    for (non_terminal, prod_num), rhs in grammar.productions.items():
+        actions.bind(prod_num, 0, lambda stack, token, name=non_terminal: stack.push(ParseNode(name)))
+        for position, symbol in enumerate(rhs, start=1):
+            if symbol in non_terminals:
+                continue  # A non-terminal adds its own node
+            actions.bind(prod_num, position, lambda stack, token: stack.top().add_child(ParseNode.for_token(token)))
+
+        def reduce(stack, token, empty=not rhs):
+            node = stack.pop()
+            if empty:
+                node.add_child(ParseNode("epsilon", is_terminal=True))
+            if stack:
+                stack.top().add_child(node)
+            else:
+                stack.push(node)
+
+        actions.bind(prod_num, len(rhs), reduce)
+    return actions
+
+
+def parse_with_actions(input_file):
+    """
+    Parse running semantic actions that build the tree again. Panic mode skips
+    grammar positions, so their tree is only the parse tree without syntax errors.
+    """
+    actions = tree_building_actions()
+    context = CompilationContext()
+    with open(input_file, "r", encoding="utf-8") as f:
+        tree, errors = Parser(Scanner(f, context), context=context, actions=actions).parse()
+    if errors:
+        return tree, errors
+    root = actions.stack.pop()
+    root.add_child(ParseNode("$", is_terminal=True))
+    return root, errors
+
+
+def run_parser_test(test_dir, parse):
+    """Run a single parser test case; returns (passed, first differing line of each file)."""
+    tree, errors = parse(test_dir / "input.txt")
+    out = io.StringIO()
+    if tree:
+        write_tree(tree, out)
+    actual_tree = out.getvalue().split("\n") if tree else []
+    actual_errors = syntax_error_lines(errors)
+    expected_tree = read_lines(test_dir / "parse_tree.txt")
+    expected_errors = read_lines(test_dir / "syntax_errors.txt")
+    differences = []
+    for name, actual, expected in (
+        ("parse tree", actual_tree, expected_tree),
+        ("syntax errors", actual_errors, expected_errors),
+    ):
+        if actual != expected:
+            line = next(
+                (i for i, (a, e) in enumerate(zip(actual, expected)) if a != e),
+                min(len(actual), len(expected)),
+            )
+            differences.append(
+                f"{name} differ at line {line + 1}: expected "
+                f"{expected[line] if line < len(expected) else '<end>'!r}, "
+                f"got {actual[line] if line < len(actual) else '<end>'!r}"
+            )
+    return not differences, differences
+
+
+def run_budget_test(test_dir):
+    """With room for one syntax error, only the first expected one is recorded, then parsing stops."""
+    budget = ErrorBudget(max_syntax_errors=1)
+    context = CompilationContext(error_budget=budget)
+    with open(test_dir / "input.txt", "r", encoding="utf-8") as f:
+        _, errors = Parser(Scanner(f, context), context=context).parse()
+    expected = read_lines(test_dir / "syntax_errors.txt")
+    actual = syntax_error_lines(errors)
+    if len(expected) > 1:
+        passed = actual == expected[:1] and budget.truncation_note() is not None
+    else:
+        passed = actual == expected and budget.truncation_note() is None
+    return passed, [] if passed else [f"expected {expected[:1]} and a truncation note, got {actual}"]
 
-    for i in range(1, 11):
-        test_name = f"T{i:02d}"
-        test_dir = test_base / test_name
 
-        if not test_dir.exists():
+def run_panic_test(parser_class, tokens: TokenBuffer):
+    """Panic mode over PANIC_TOKENS illegal tokens: one error each, in loops, within the time limit."""
+    start = time.perf_counter()
+    _, errors = parser_class(tokens.reader(), build_tree=False).parse()
+    seconds = time.perf_counter() - start
+    differences = []
+    # One "illegal else" per token, then "Unexpected EOF"
+    if len(errors) != PANIC_TOKENS + 1:
+        differences.append(f"expected {PANIC_TOKENS + 1} syntax errors, got {len(errors)}")
+    if seconds > PANIC_TIME_LIMIT:
+        differences.append(f"took {seconds:.1f} s, the limit is {PANIC_TIME_LIMIT:.0f} s")
+    return not differences, differences
+
+
+def report_parser_test(test_name, result) -> bool:
+    passed, differences = result
+    if passed:
+        print(f"✅ {test_name}: PASSED")
+    else:
+        print(f"❌ {test_name}: FAILED")
+        for difference in differences:
+            print(f"  {difference}")
+    return passed
+
+
+def run_suite(test_dirs, run, report, label, concurrent=True) -> bool:
+    """Run a test function over test directories and report in order; returns whether all passed."""
+    all_passed = True
+    # Tests share no state, so they run concurrently and report in order
+    # (except engines with worker processes, which are not started from threads)
+    if concurrent:
+        with ThreadPoolExecutor() as executor:
+            results = {
+                test_dir: executor.submit(run, test_dir)
+                for test_dir in test_dirs
+                if test_dir.exists()
+            }
+        results = {test_dir: future.result() for test_dir, future in results.items()}
+    else:
+        results = {test_dir: run(test_dir) for test_dir in test_dirs if test_dir.exists()}
+
+    for test_dir in test_dirs:
+        test_name = f"{test_dir.name} [{label}]"
+        if test_dir not in results:
             print(f"❌ {test_name}: Test directory not found")
             all_passed = False
             continue
+        if not report(test_name, results[test_dir]):
+            all_passed = False
+    return all_passed
 
-        (
-            tokens_match,
-            errors_match,
-            symbols_match,
-            actual_tokens,
-            actual_errors,
-            actual_symbols,
-            expected_tokens_lines,
-            expected_errors_lines,
-            expected_symbols_lines,
-        ) = run_test(test_dir)
-
-        if tokens_match and errors_match and symbols_match:
-            print(f"✅ {test_name}: PASSED")
-        else:
-            print(f"❌ {test_name}: FAILED")
+
+def main():
+    all_passed = True
+
+    phase1_dirs = [TEST_BASE / "phase1-tests" / f"T{i:02d}" for i in range(1, 11)]
+    lexers = [
+        ("char", scan_with(Scanner), True),
+        ("regex", scan_with(RegexScanner), True),
+        ("incremental", lex_incrementally, True),
+        ("parallel", lex_in_workers, False),
+    ]
+    for label, lex, concurrent in lexers:
+        def run(test_dir, lex=lex):
+            return run_test(test_dir, lex)
+
+        if not run_suite(phase1_dirs, run, report_scanner_test, f"scanner {label}", concurrent):
             all_passed = False
 
-            if not tokens_match:
-                print("  Tokens mismatch:")
-                print(f"    Expected ({len(expected_tokens_lines)} lines):")
-                for line in expected_tokens_lines[:5]:
-                    print(f"      {line}")
-                if len(expected_tokens_lines) > 5:
-                    print(f"      ... ({len(expected_tokens_lines) - 5} more lines)")
-                print(f"    Actual ({len(actual_tokens)} lines):")
-                for line in actual_tokens[:5]:
-                    print(f"      {line}")
-                if len(actual_tokens) > 5:
-                    print(f"      ... ({len(actual_tokens) - 5} more lines)")
-
-            if not errors_match:
-                print("  Errors mismatch:")
-                print("    Expected:")
-                for line in expected_errors_lines:
-                    print(f"      {line}")
-                print("    Actual:")
-                for line in actual_errors:
-                    print(f"      {line}")
-
-            if not symbols_match:
-                print("  Symbol table mismatch:")
-                print("    Expected:")
-                for line in expected_symbols_lines[:10]:
-                    print(f"      {line}")
-                if len(expected_symbols_lines) > 10:
-                    print(f"      ... ({len(expected_symbols_lines) - 10} more lines)")
-                print("    Actual:")
-                for line in actual_symbols[:10]:
-                    print(f"      {line}")
-                if len(actual_symbols) > 10:
-                    print(f"      ... ({len(actual_symbols) - 10} more lines)")
+    phase2_dirs = [TEST_BASE / "phase2-tests" / f"T{i:02d}" for i in range(1, 11)]
+    generated_parser = load_generated_parser()
+    parsers = [
+        ("recursive", parse_with(Parser), True),
+        ("stack", parse_with(StackParser), True),
+        ("generated", parse_with(generated_parser), True),
+        ("recursive, regex scanner", parse_with(Parser, RegexScanner), True),
+        ("stack, regex scanner", parse_with(StackParser, RegexScanner), True),
+        ("generated, regex scanner", parse_with(generated_parser, RegexScanner), True),
+        ("recursive, tree arena", parse_with(Parser, arena=True), True),
+        ("stack, tree arena", parse_with(StackParser, arena=True), True),
+        ("generated, tree arena", parse_with(generated_parser, arena=True), True),
+        ("prelexed", parse_prelexed, True),
+        ("incremental", parse_incrementally, True),
+        ("semantic actions", parse_with_actions, True),
+        ("parallel", parse_in_workers, False),
+    ]
+    for label, parse, concurrent in parsers:
+        def run(test_dir, parse=parse):
+            return run_parser_test(test_dir, parse)
+
+        if not run_suite(phase2_dirs, run, report_parser_test, f"parser {label}", concurrent):
+            all_passed = False
+    if not run_suite(phase2_dirs, run_budget_test, report_parser_test, "error budget"):
+        all_passed = False
+
+    tokens = TokenBuffer.lex("int x;\n" + "else " * PANIC_TOKENS)
+    for label, parser_class in (("recursive", Parser), ("stack", StackParser), ("generated", generated_parser)):
+        test_name = f"panic mode over {PANIC_TOKENS:,} illegal tokens [{label}]"
+        if not report_parser_test(test_name, run_panic_test(parser_class, tokens)):
+            all_passed = False
 
     if all_passed:
         print("\n🎉 All tests passed!")
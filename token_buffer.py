@@ -0,0 +1,80 @@
+from array import array
+
+from context import CompilationContext
+from scanner import T_EOF, Scanner
+from tokens import TOKEN_TYPES, Token
+
+
+class TokenBuffer:
+    """
+    A whole token stream, EOF included, in compact parallel arrays: terminal
+    IDs, lines and columns, plus each token's lexeme (keyword and symbol
+    lexemes are shared strings). Lex a source once, then parse it any number
+    of times through reader().
+    """
+
+    def __init__(self):
+        self.terminals = array("B")
+        self.lines = array("i")
+        self.columns = array("i")
+        self.lexemes = []
+
+    @classmethod
+    def lex(cls, source, context: CompilationContext = None, scanner_class=Scanner) -> "TokenBuffer":
+        """Scan a whole source (anything a Scanner accepts) into a buffer."""
+        scanner = scanner_class(source, context)
+        buffer = cls()
+        append = buffer.append
+        token = scanner.get_next_token()
+        while token.terminal != T_EOF:
+            append(token)
+            token = scanner.get_next_token()
+        append(token)
+        return buffer
+
+    @classmethod
+    def from_tokens(cls, tokens) -> "TokenBuffer":
+        tokens = list(tokens)
+        buffer = cls()
+        buffer.terminals = array("B", [token.terminal for token in tokens])
+        buffer.lines = array("i", [token.line_number for token in tokens])
+        buffer.columns = array("i", [token.column or 0 for token in tokens])
+        buffer.lexemes = [token.token_string for token in tokens]
+        return buffer
+
+    def append(self, token: Token) -> None:
+        self.terminals.append(token.terminal)
+        self.lines.append(token.line_number)
+        self.columns.append(token.column if token.column is not None else 0)
+        self.lexemes.append(token.token_string)
+
+    def __len__(self) -> int:
+        return len(self.terminals)
+
+    def token(self, index: int) -> Token:
+        terminal = self.terminals[index]
+        column = self.columns[index]
+        return Token(
+            self.lines[index], TOKEN_TYPES[terminal], self.lexemes[index], terminal, column=column or None
+        )
+
+    def reader(self) -> "TokenReader":
+        return TokenReader(self)
+
+
+class TokenReader:
+    """
+    Hands out a TokenBuffer's tokens one at a time in place of a scanner, so a
+    parser still sees only its current token. The EOF token repeats at the end.
+    """
+
+    def __init__(self, buffer: TokenBuffer):
+        self.buffer = buffer
+        self.index = 0
+        self.last = len(buffer) - 1
+
+    def get_next_token(self) -> Token:
+        index = self.index
+        if index < self.last:
+            self.index = index + 1
+        return self.buffer.token(index)
@@ -1,5 +1,7 @@
 from enum import Enum
 
+from consts import KEYWORDS, TERMINAL_IDS, TERMINALS
+
 
 class TokenType(Enum):
     NUMBER = "NUM"
@@ -9,11 +11,62 @@ class TokenType(Enum):
     EOF = "EOF"
 
 
+def terminal_id(token_type: TokenType, token_string: str) -> int:
+    """Parser terminal ID of a token: its keyword/symbol, or its token class."""
+    if token_type == TokenType.KEYWORD or token_type == TokenType.SYMBOL:
+        return TERMINAL_IDS[token_string]
+    if token_type == TokenType.EOF:
+        return TERMINAL_IDS["$"]
+    return TERMINAL_IDS[token_type.value]
+
+
+# Token type of each terminal ID
+TOKEN_TYPES = [
+    TokenType.EOF if name == "$"
+    else TokenType.ID if name == "ID"
+    else TokenType.NUMBER if name == "NUM"
+    else TokenType.KEYWORD if name in KEYWORDS
+    else TokenType.SYMBOL
+    for name in TERMINALS
+]
+
+
 class Token:
-    def __init__(self, line_number: int, token_type: TokenType, token_string: str):
+    """
+    A scanned token. ID and NUM tokens may be created with a (start, end) span of
+    the source text instead of a string, which is then only sliced out when first read.
+    column is the 1-based column of the token's first character, if known.
+    """
+
+    __slots__ = ("line_number", "column", "token_type", "terminal", "source", "start", "end", "_token_string")
+
+    def __init__(
+        self,
+        line_number: int,
+        token_type: TokenType,
+        token_string: str,
+        terminal: int = None,
+        source: str = None,
+        start: int = 0,
+        end: int = 0,
+        column: int = None,
+    ):
         self.line_number = line_number
+        self.column = column
         self.token_type = token_type
-        self.token_string = token_string
+        self._token_string = token_string
+        # With token_string None, the lexeme is source[start:end]
+        self.source = source
+        self.start = start
+        self.end = end
+        self.terminal = terminal if terminal is not None else terminal_id(token_type, self.token_string)
+
+    @property
+    def token_string(self) -> str:
+        token_string = self._token_string
+        if token_string is None:
+            token_string = self._token_string = self.source[self.start:self.end]
+        return token_string
 
     def __str__(self):
         return f"({self.token_type}, {self.token_string})"
@@ -0,0 +1,195 @@
+from array import array
+
+from consts import KEYWORDS, TERMINALS
+from tokens import Token, TokenType
+from tree_writer import tree_to_string
+
+NO_NODE = -1
+
+# Node kinds below len(TERMINALS) are terminal IDs, the rest index ParseTreeArena.names
+NAME_KIND_BASE = len(TERMINALS)
+
+# Label of a token node by terminal ID; ID and NUM nodes also need their lexeme
+_TOKEN_LABELS = [
+    "$" if name == "$"
+    else None if name in ("ID", "NUM")
+    else f"(KEYWORD, {name})" if name in KEYWORDS
+    else f"(SYMBOL, {name})"
+    for name in TERMINALS
+]
+
+
+class ParseTreeArena:
+    """
+    Parse tree stored as parallel arrays instead of one ParseNode object per node.
+    Node i has kinds[i] (terminal ID or name index), tokens[i] (lexeme index of
+    ID/NUM nodes, else NO_NODE), first_child[i] and next_sibling[i].
+    Navigate it through NodeView objects.
+    """
+
+    def __init__(self, names=()):
+        self.kinds = array("i")
+        self.tokens = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        # Only needed while building, to append children in O(1)
+        self.last_child = array("i")
+        # Non-terminal names plus "epsilon" and "$"
+        self.names = []
+        self._name_kinds = {}
+        # Names interned up front, so arenas created with the same ones share node kinds
+        for name in names:
+            self._name_kind(name)
+        # Interned ID and NUM lexemes
+        self.lexemes = []
+        self._lexeme_ids = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def _append(self, kind: int, token: int) -> int:
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.tokens.append(token)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.last_child.append(NO_NODE)
+        return index
+
+    def _name_kind(self, name: str) -> int:
+        kind = self._name_kinds.get(name)
+        if kind is None:
+            kind = NAME_KIND_BASE + len(self.names)
+            self.names.append(name)
+            self._name_kinds[name] = kind
+        return kind
+
+    def _lexeme_id(self, lexeme: str) -> int:
+        lexeme_id = self._lexeme_ids.get(lexeme)
+        if lexeme_id is None:
+            lexeme_id = len(self.lexemes)
+            self.lexemes.append(lexeme)
+            self._lexeme_ids[lexeme] = lexeme_id
+        return lexeme_id
+
+    def new_node(self, name: str, is_terminal: bool = False) -> "NodeView":
+        """Add a node labelled by name (non-terminal, epsilon or $)."""
+        return NodeView(self, self._append(self._name_kind(name), NO_NODE))
+
+    def new_token_node(self, token: Token) -> "NodeView":
+        """Add a terminal node for a matched token."""
+        lexeme_id = NO_NODE
+        if token.token_type == TokenType.ID or token.token_type == TokenType.NUMBER:
+            lexeme_id = self._lexeme_id(token.token_string)
+        return NodeView(self, self._append(token.terminal, lexeme_id))
+
+    def extend(self, other: "ParseTreeArena") -> int:
+        """
+        Append all nodes of another arena, with its names and lexemes mapped
+        to this one's. Returns the offset to add to the other arena's indexes.
+        """
+        offset = len(self.kinds)
+        # Lookup lists, where NO_NODE (-1) picks the last entry, which is NO_NODE
+        kind_map = list(range(NAME_KIND_BASE)) + [self._name_kind(name) for name in other.names]
+        lexeme_map = [self._lexeme_id(lexeme) for lexeme in other.lexemes] + [NO_NODE]
+        node_map = list(range(offset, offset + len(other))) + [NO_NODE]
+        if kind_map == list(range(len(kind_map))):
+            self.kinds.extend(other.kinds)
+        else:
+            self.kinds.extend(array("i", [kind_map[kind] for kind in other.kinds]))
+        self.tokens.extend(array("i", [lexeme_map[token] for token in other.tokens]))
+        self.first_child.extend(array("i", [node_map[node] for node in other.first_child]))
+        self.next_sibling.extend(array("i", [node_map[node] for node in other.next_sibling]))
+        # The other arena's nodes are finished: they get no more children
+        self.last_child.extend(array("i", [NO_NODE]) * len(other))
+        return offset
+
+    def add_child(self, parent: int, child: int) -> None:
+        last = self.last_child[parent]
+        if last == NO_NODE:
+            self.first_child[parent] = child
+        else:
+            self.next_sibling[last] = child
+        self.last_child[parent] = child
+
+    def children(self, index: int) -> list[int]:
+        result = []
+        child = self.first_child[index]
+        while child != NO_NODE:
+            result.append(child)
+            child = self.next_sibling[child]
+        return result
+
+    def is_terminal(self, index: int) -> bool:
+        kind = self.kinds[index]
+        return kind < NAME_KIND_BASE or self.names[kind - NAME_KIND_BASE] in ("epsilon", "$")
+
+    def label(self, index: int) -> str:
+        kind = self.kinds[index]
+        if kind >= NAME_KIND_BASE:
+            return self.names[kind - NAME_KIND_BASE]
+        label = _TOKEN_LABELS[kind]
+        if label is None:
+            return f"({TERMINALS[kind]}, {self.lexemes[self.tokens[index]]})"
+        return label
+
+    def nbytes(self) -> int:
+        """Bytes used by the node arrays (names and lexemes are shared strings)."""
+        return sum(
+            a.itemsize * len(a)
+            for a in (self.kinds, self.tokens, self.first_child, self.next_sibling, self.last_child)
+        )
+
+
+class NodeView:
+    """Lightweight handle on one node of a ParseTreeArena, with the ParseNode interface."""
+
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena: ParseTreeArena, index: int):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.arena.label(self.index)
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.arena.is_terminal(self.index)
+
+    @property
+    def children(self) -> "ChildList":
+        return ChildList(self.arena, self.index)
+
+    def add_child(self, child):
+        # Skip None children
+        if child is not None:
+            self.arena.add_child(self.index, child.index)
+
+    def to_string(self) -> str:
+        """Convert parse tree to required string format with tree-drawing characters."""
+        return tree_to_string(self)
+
+
+class ChildList:
+    """List-like view of a node's children, so parsers can use node.children.append."""
+
+    __slots__ = ("arena", "parent")
+
+    def __init__(self, arena: ParseTreeArena, parent: int):
+        self.arena = arena
+        self.parent = parent
+
+    def append(self, child: NodeView):
+        self.arena.add_child(self.parent, child.index)
+
+    def __len__(self) -> int:
+        return len(self.arena.children(self.parent))
+
+    def __iter__(self):
+        arena = self.arena
+        child = arena.first_child[self.parent]
+        while child != NO_NODE:
+            yield NodeView(arena, child)
+            child = arena.next_sibling[child]
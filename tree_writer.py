@@ -0,0 +1,48 @@
+import io
+
+_END = object()
+
+
+def write_tree(root, out) -> None:
+    """
+    Write a parse tree with tree-drawing characters to a text stream, one line per node.
+    The tree is walked iteratively, so depth is not limited by the recursion limit,
+    and only the current path (prefix and sibling iterator per level) is kept in memory.
+    No newline is written after the last line.
+    """
+    write = out.write
+    write(root.name)
+
+    # (prefix, sibling iterator, next sibling) of each ancestor still being drawn
+    stack = []
+    prefix = ""
+    siblings = iter(root.children)
+    node = next(siblings, _END)
+    while True:
+        if node is _END:
+            if not stack:
+                return
+            prefix, siblings, node = stack.pop()
+            continue
+
+        following = next(siblings, _END)
+        is_last = following is _END
+        write(f"\n{prefix}{'└── ' if is_last else '├── '}{node.name}")
+
+        children = iter(node.children)
+        child = next(children, _END)
+        if child is _END:
+            node = following
+        else:
+            stack.append((prefix, siblings, following))
+            prefix += "    " if is_last else "│   "
+            siblings = children
+            node = child
+
+
+def tree_to_string(root) -> str:
+    """Whole tree drawing as a string, with a trailing newline."""
+    out = io.StringIO()
+    write_tree(root, out)
+    out.write("\n")
+    return out.getvalue()